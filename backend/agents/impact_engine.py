@@ -1,8 +1,23 @@
-import os, re, json, ast, networkx as nx
+import os, re, json, time, heapq, threading, multiprocessing, networkx as nx
+from concurrent.futures import ProcessPoolExecutor
 from typing import List
+from core.bounded_cache import BoundedCache
+from core.metrics import histogram, SIZE_BUCKETS
+from core.graph_store import (
+    repo_key,
+    repo_snapshot,
+    load_imports,
+    save_imports,
+    load_graph,
+    save_graph
+)
+from compact_graph import CompactGraph
+from agents.js_import_scanner import JS_EXTENSIONS, js_candidates
+from intelligence.file_analysis import analyze_file
+from reachability_index import ReachabilityIndex, REACHABILITY_INDEX
 from blast_radius import (
     build_reverse_graph,
-    compute_blast_radius
+    compute_multi_source_blast_radius
 )
 IGNORED_DIRS = {
     "node_modules", ".git", "dist", "build", "venv",
@@ -11,82 +26,441 @@ IGNORED_DIRS = {
     "coverage", "fixtures", "scripts",
     "benchmark", "__mocks__"
 }
-GRAPH_CACHE = {}
+SOURCE_EXTENSIONS = (".py",) + JS_EXTENSIONS
+# Hot repos' graphs stay warm; cold ones are evicted by LRU/LFU, byte budget or TTL
+GRAPH_CACHE = BoundedCache(
+    "graph",
+    max_entries=int(os.getenv("GRAPH_CACHE_MAX_ENTRIES", 32)),
+    max_bytes=int(os.getenv("GRAPH_CACHE_MAX_BYTES", 512 * 1024 * 1024)),
+    ttl=float(os.getenv("GRAPH_CACHE_TTL", 3600)),
+    policy=os.getenv("GRAPH_CACHE_POLICY", "lru")
+)
+ANALYSIS_STEP_SECONDS = histogram("analysis_step_seconds", "Wall time of graph build and blast radius", ("step",))
+GRAPH_NODES = histogram("graph_nodes", "Files in the dependency graph of an analyzed PR", buckets=SIZE_BUCKETS)
+GRAPH_EDGES = histogram("graph_edges", "Import edges in the dependency graph of an analyzed PR", buckets=SIZE_BUCKETS)
+IMPACTED_FILES = histogram("impacted_files", "Dependents reached from a PR's changed files", buckets=SIZE_BUCKETS)
+# Parallel import extraction: 0/1 workers keeps parsing in the request thread
+IMPORT_WORKERS = int(os.getenv("IMPORT_WORKERS", 0))
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", 64))
+PARALLEL_MIN_FILES = int(os.getenv("PARALLEL_MIN_FILES", 200))
+# The server is multithreaded; a forked worker could inherit a cache or
+# metrics lock held by another thread and deadlock on its first parse
+IMPORT_POOL_START_METHOD = os.getenv("IMPORT_POOL_START_METHOD", "forkserver")
+_IMPORT_POOL = None
+_IMPORT_POOL_WORKERS = 0
+_IMPORT_POOL_LOCK = threading.Lock()
 
 def extract_imports(file_path):
-    imports = []
-    if not file_path.endswith(".py"):
-        return imports
-    try:
-        with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-            source = f.read()
-        try:
-            tree = ast.parse(source)
-            for node in ast.walk(tree):
-                if isinstance(node, ast.Import):
-                    for alias in node.names:
-                        imports.append(alias.name)
-                elif isinstance(node, ast.ImportFrom):
-                    if node.module:
-                        imports.append(node.module)
-        except SyntaxError:
-            # Fallback regex-based extraction
-            for line in source.splitlines():
-                line = line.strip()
-                if line.startswith("import "):
-                    module = line.replace("import ", "").split(" as ")[0]
-                    imports.append(module)
-                elif line.startswith("from "):
-                    module = line.replace("from ", "").split(" import ")[0]
-                    imports.append(module)
-    except Exception as e:
-        print(f"[IMPORT PARSE ERROR] {file_path} -> {e}")
-    return imports
-
-def build_dependency_graph(repo_path):
+    if not file_path.endswith(SOURCE_EXTENSIONS):
+        return []
+    return list(analyze_file(file_path).imports)
+
+def _extract_imports_chunk(paths):
+    # Runs in a pool worker; tuples pickle smaller than lists of lists
+    return [tuple(extract_imports(path)) for path in paths]
+
+def _get_import_pool(workers):
+    global _IMPORT_POOL, _IMPORT_POOL_WORKERS
+    with _IMPORT_POOL_LOCK:
+        if _IMPORT_POOL is None or _IMPORT_POOL_WORKERS != workers:
+            if _IMPORT_POOL is not None:
+                _IMPORT_POOL.shutdown(wait=False)
+            _IMPORT_POOL = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context(IMPORT_POOL_START_METHOD)
+            )
+            _IMPORT_POOL_WORKERS = workers
+        return _IMPORT_POOL
+
+def start_import_pool():
+    """Start the import pool's workers at server startup, not mid-request."""
+    if IMPORT_WORKERS > 1:
+        list(_get_import_pool(IMPORT_WORKERS).map(_extract_imports_chunk, [[]] * IMPORT_WORKERS))
+
+def extract_imports_bulk(repo_path, repo_files, workers=None, chunk_size=None):
+    """Extract imports for ``repo_files`` (repo-relative), keyed by file.
+
+    With more than one worker and at least PARALLEL_MIN_FILES files, parsing
+    is spread over a shared process pool in chunks; results are identical to
+    calling extract_imports on each file in order.
+    """
+    workers = IMPORT_WORKERS if workers is None else workers
+    chunk_size = chunk_size or IMPORT_CHUNK_SIZE
+    full_paths = [os.path.join(repo_path, file) for file in repo_files]
+    if workers <= 1 or len(full_paths) < PARALLEL_MIN_FILES:
+        return dict(zip(repo_files, _extract_imports_chunk(full_paths)))
+    chunks = [
+        full_paths[i:i + chunk_size]
+        for i in range(0, len(full_paths), chunk_size)
+    ]
+    pool = _get_import_pool(workers)
+    results = {}
+    offset = 0
+    for chunk_imports in pool.map(_extract_imports_chunk, chunks):
+        for imports in chunk_imports:
+            results[repo_files[offset]] = imports
+            offset += 1
+    return results
+
+def module_path_of(file):
+    # "pkg/sub/mod.py" -> "pkg/sub/mod", "pkg/sub/__init__.py" -> "pkg/sub"
+    path = file[:-3] if file.endswith(".py") else file
+    if path == "__init__":
+        return ""
+    if path.endswith("/__init__"):
+        path = path[:-len("/__init__")]
+    return path
+
+class ModuleIndex:
+    """Maps module names to repo files, built once per repository snapshot.
+
+    ``by_suffix`` holds every dotted suffix of a file's module path, so an
+    absolute import resolves with a single dict lookup wherever the package
+    root sits in the repo (``src/`` layouts, monorepo subprojects).
+    ``by_path`` holds exact slash paths for relative import resolution.
+    JS/TS files are only tracked in ``files``; their relative specifiers
+    resolve against it through js_candidates.
+    """
+    def __init__(self, repo_files=()):
+        self.by_suffix = {}
+        self.by_path = {}
+        self.files = set()
+        for file in repo_files:
+            self.add(file)
+
+    def add(self, file):
+        self.files.add(file)
+        if not file.endswith(".py"):
+            return
+        path = module_path_of(file)
+        if not path:
+            return
+        self.by_path.setdefault(path, []).append(file)
+        parts = path.split("/")
+        for i in range(len(parts)):
+            self.by_suffix.setdefault(".".join(parts[i:]), []).append(file)
+
+    def remove(self, file):
+        self.files.discard(file)
+        if not file.endswith(".py"):
+            return
+        path = module_path_of(file)
+        if not path:
+            return
+        parts = path.split("/")
+        keys = [(self.by_path, path)] + [
+            (self.by_suffix, ".".join(parts[i:])) for i in range(len(parts))
+        ]
+        for table, key in keys:
+            files = table.get(key)
+            if files and file in files:
+                files.remove(file)
+                if not files:
+                    del table[key]
+
+    def copy(self):
+        clone = ModuleIndex()
+        clone.by_suffix = {k: list(v) for k, v in self.by_suffix.items()}
+        clone.by_path = {k: list(v) for k, v in self.by_path.items()}
+        clone.files = set(self.files)
+        return clone
+
+    def lookup_key(self, importer, module):
+        """Key under which ``module`` (as written in ``importer``) is indexed.
+
+        Absolute imports map to their dotted name in ``by_suffix``; relative
+        imports map to an exact ``path:`` entry in ``by_path``. Returns None
+        when a relative import climbs above the repository root.
+        """
+        if not module.startswith("."):
+            return module
+        level = len(module) - len(module.lstrip("."))
+        package = importer.rsplit("/", 1)[0].split("/") if "/" in importer else []
+        if level - 1 > len(package):
+            return None
+        package = package[:len(package) - (level - 1)]
+        rest = module[level:]
+        parts = package + (rest.split(".") if rest else [])
+        return "path:" + "/".join(parts)
+
+    def file_keys(self, file):
+        """Lookup keys whose resolution changes when ``file`` is added or removed."""
+        keys = ["file:" + file]
+        path = module_path_of(file) if file.endswith(".py") else ""
+        if not path:
+            return keys
+        parts = path.split("/")
+        return keys + ["path:" + path] + [".".join(parts[i:]) for i in range(len(parts))]
+
+    def dependency_keys(self, importer, module):
+        """Lookup keys ``module`` may resolve through, including the package fallback."""
+        if importer.endswith(JS_EXTENSIONS):
+            return ["file:" + c for c in js_candidates(importer, module)]
+        key = self.lookup_key(importer, module)
+        if key is None:
+            return []
+        keys = [key]
+        rest = module.lstrip(".")
+        if key.startswith("path:") and rest and "." not in rest and "/" in key:
+            keys.append(key.rsplit("/", 1)[0])
+        return keys
+
+    def resolve(self, importer, module):
+        if importer.endswith(JS_EXTENSIONS):
+            for candidate in js_candidates(importer, module):
+                if candidate in self.files:
+                    return [candidate]
+            return []
+        key = self.lookup_key(importer, module)
+        if key is None:
+            return []
+        if not key.startswith("path:"):
+            return self.by_suffix.get(key, [])
+        path = key[len("path:"):]
+        files = self.by_path.get(path)
+        if files:
+            return files
+        # "from . import name" where name is defined in the package __init__
+        rest = module.lstrip(".")
+        if rest and "." not in rest:
+            return self.by_path.get(path.rsplit("/", 1)[0] if "/" in path else "", [])
+        return []
+
+def _skip_dir(d):
+    return d in IGNORED_DIRS or d.startswith("docs") or d.startswith("example")
+
+def is_graph_file(path):
+    # Mirrors the os.walk filtering in build_dependency_graph for diff paths
+    parts = path.split("/")
+    return path.endswith(SOURCE_EXTENSIONS) and not any(_skip_dir(d) for d in parts[:-1])
+
+# Read by stack_detector from the repository root
+MANIFEST_FILES = ("package.json", "requirements.txt", "pyproject.toml")
+
+def _escape_sparse_path(path):
+    # Anchored with a leading "/", so only glob characters need escaping
+    return re.sub(r"([*?\[\\])", r"\\\1", path.lstrip("/"))
+
+def sparse_checkout_patterns(extra_paths=()):
+    """Non-cone sparse-checkout patterns for the files the analyzers read.
+
+    Sources outside the skipped directories, root manifests, and
+    ``extra_paths`` (e.g. the PR's changed files) wherever they live.
+    """
+    patterns = ["*" + ext for ext in SOURCE_EXTENSIONS]
+    patterns += ["/" + name for name in MANIFEST_FILES]
+    patterns += [f"!**/{d}/**" for d in sorted(IGNORED_DIRS)]
+    patterns += ["!**/docs*/**", "!**/example*/**"]
+    # Listed last so they win over the exclusions above
+    patterns += ["/" + _escape_sparse_path(path) for path in extra_paths if path]
+    return patterns
+
+def _graph_from_files(files, edges):
+    G = nx.DiGraph()
+    for path, blob, imports in files:
+        G.add_node(path, blob=blob, imports=imports)
+    G.add_edges_from((files[i][0], files[j][0]) for i, j in edges)
+    return G
+
+def _persist_graph(snapshot, G):
+    positions = {node: i for i, node in enumerate(G.nodes)}
+    save_graph(
+        snapshot["repo"],
+        snapshot["commit"],
+        [(node, attrs.get("blob"), attrs.get("imports", ())) for node, attrs in G.nodes(data=True)],
+        [[positions[a], positions[b]] for a, b in G.edges]
+    )
+
+def _import_kind(file):
+    return "js" if file.endswith(JS_EXTENSIONS) else "py"
+
+def load_file_imports(repo_path, repo_files, blobs=None, workers=None):
+    """Imports per file, reusing the on-disk cache for known blob hashes.
+
+    Only files whose blob is unknown or not cached yet are parsed; their
+    results are written back so later snapshots and restarted workers skip
+    them.
+    """
+    blobs = blobs or {}
+    file_imports = {}
+    missing = []
+    for file in repo_files:
+        blob = blobs.get(file)
+        cached = load_imports(blob, _import_kind(file)) if blob else None
+        if cached is None:
+            missing.append(file)
+        else:
+            file_imports[file] = cached
+    print("IMPORT CACHE HITS:", len(file_imports), "MISSES:", len(missing))
+    parsed = extract_imports_bulk(repo_path, missing, workers=workers)
+    for file, imports in parsed.items():
+        if blobs.get(file):
+            save_imports(blobs[file], imports, _import_kind(file))
+    file_imports.update(parsed)
+    return file_imports
+
+def load_snapshot_graph(repo_url, commit):
+    """Graph previously built for ``commit`` of ``repo_url``, if still cached."""
+    if not repo_url or not commit:
+        return None
+    stored = load_graph(repo_key(repo_url), commit)
+    return _graph_from_files(*stored) if stored is not None else None
+
+def _importers_of(G, index):
+    importers = {}
+    for file, imports in G.nodes(data="imports", default=()):
+        for imp in imports:
+            for key in index.dependency_keys(file, imp):
+                importers.setdefault(key, set()).add(file)
+    return importers
+
+def _link_file(G, index, file):
+    G.remove_edges_from(list(G.out_edges(file)))
+    for imp in G.nodes[file]["imports"]:
+        for repo_file in index.resolve(file, imp):
+            if repo_file != file:
+                G.add_edge(file, repo_file)
+
+def update_dependency_graph(base_graph, repo_path, changed_files, blobs=None, workers=None):
+    """Patch a base snapshot's graph into the graph of ``repo_path``.
+
+    Only files listed in ``changed_files`` (plus, when ``blobs`` is given,
+    any file whose blob differs from the base) are re-parsed. Files that
+    import an added or deleted module are re-linked from their stored
+    imports without being parsed again. ``base_graph`` is not modified.
+    """
     repo_path = os.path.abspath(repo_path)
-    if repo_path in GRAPH_CACHE:
-        return GRAPH_CACHE[repo_path]
+    blobs = blobs or {}
+    G = base_graph.copy()
+    touched = {
+        f.replace("\\", "/").lstrip("./") for f in changed_files
+    }
+    if blobs:
+        touched.update(f for f in blobs if is_graph_file(f) and G.nodes.get(f, {}).get("blob") != blobs[f])
+        touched.update(f for f in G.nodes if f not in blobs)
+    touched = {f for f in touched if is_graph_file(f)}
+    index = ModuleIndex(G.nodes)
+    importers = _importers_of(G, index)
+    present = {f for f in touched if os.path.isfile(os.path.join(repo_path, f))}
+    deleted = {f for f in touched - present if f in G}
+    added = {f for f in present if f not in G}
+    relink = set()
+    for file in deleted | added:
+        for key in index.file_keys(file):
+            relink.update(importers.get(key, ()))
+    for file in deleted:
+        G.remove_node(file)
+        index.remove(file)
+    for file in sorted(added):
+        G.add_node(file)
+        index.add(file)
+    file_imports = load_file_imports(repo_path, sorted(present), blobs, workers=workers)
+    for file in present:
+        G.nodes[file]["blob"] = blobs.get(file)
+        G.nodes[file]["imports"] = file_imports[file]
+    for file in (relink - deleted) | present:
+        _link_file(G, index, file)
+    print("INCREMENTAL GRAPH UPDATE - PARSED:", len(present), "DELETED:", len(deleted), "RELINKED:", len(relink - deleted - present))
+    return G
+
+def build_dependency_graph(repo_path, workers=None, base_graph=None, changed_files=None, snapshot=None):
+    repo_path = os.path.abspath(repo_path)
+    if snapshot is None:
+        snapshot = repo_snapshot(repo_path)
+    if snapshot:
+        stored = load_graph(snapshot["repo"], snapshot["commit"])
+        if stored is not None:
+            print("GRAPH CACHE HIT:", snapshot["commit"])
+            return _graph_from_files(*stored)
+    if base_graph is not None:
+        G = update_dependency_graph(
+            base_graph,
+            repo_path,
+            changed_files or [],
+            blobs=snapshot["blobs"] if snapshot else None,
+            workers=workers
+        )
+        if snapshot:
+            _persist_graph(snapshot, G)
+        return G
+    blobs = snapshot["blobs"] if snapshot else {}
     print("SCANNING PATH:", repo_path)
     G = nx.DiGraph()
-    repo_files = set()
+    repo_files = []
     for root, dirs, files in os.walk(repo_path):
-        dirs[:] = [
-            d for d in dirs
-            if d not in IGNORED_DIRS
-            and not d.startswith("docs")
-            and not d.startswith("example")
-        ]
+        dirs[:] = [d for d in dirs if not _skip_dir(d)]
         for file in files:
-            if file.endswith((".py")):
+            if file.endswith(SOURCE_EXTENSIONS):
                 full_path = os.path.join(root, file)
                 relative_path = os.path.relpath(full_path, repo_path).replace("\\", "/").lstrip("./")
-                repo_files.add(relative_path)
-                G.add_node(relative_path)
+                repo_files.append(relative_path)
     print("TOTAL FILES:", len(repo_files))
+    index = ModuleIndex(repo_files)
+    file_imports = load_file_imports(repo_path, repo_files, blobs, workers=workers)
     for file in repo_files:
-        full_path = os.path.join(repo_path, file)
-        imports = extract_imports(full_path)
-        for imp in imports:
-            module_path = imp.replace(".", "/")
-            # try matching anywhere inside repo (more robust)
-            for repo_file in repo_files:
-                if (repo_file.endswith(module_path + ".py") or \
-                repo_file.endswith(module_path + "/__init__.py")):
-                    if repo_file != file:
-                        G.add_edge(file, repo_file)
+        G.add_node(file, blob=blobs.get(file), imports=file_imports[file])
+    for file in repo_files:
+        for imp in file_imports[file]:
+            for repo_file in index.resolve(file, imp):
+                if repo_file != file:
+                    G.add_edge(file, repo_file)
     print("TOTAL EDGES:", len(G.edges))
     print("GRAPH SAMPLE EDGES:", list(G.edges())[:20])
-    GRAPH_CACHE[repo_path] = G
+    if snapshot:
+        _persist_graph(snapshot, G)
     return G
-    
+
+def load_compact_graph(repo_path, workers=None, base_graph=None, changed_files=None):
+    """CompactGraph for the checkout at ``repo_path``, cached in process.
+
+    The networkx graph from build_dependency_graph is only kept long enough
+    to convert it; queries run on the CSR arrays.
+    """
+    repo_path = os.path.abspath(repo_path)
+    snapshot = repo_snapshot(repo_path)
+    cache_key = (snapshot["repo"], snapshot["commit"]) if snapshot else repo_path
+    cached = GRAPH_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+    G = build_dependency_graph(
+        repo_path,
+        workers=workers,
+        base_graph=base_graph,
+        changed_files=changed_files,
+        snapshot=snapshot
+    )
+    compact = CompactGraph.from_networkx(G)
+    if REACHABILITY_INDEX:
+        compact.reachability = ReachabilityIndex.build(compact.reverse())
+    GRAPH_CACHE.set(cache_key, compact)
+    return compact
+
+MAX_REPORTED_CYCLES = 5
+MAX_CYCLE_FILES = 20
+
+def summarize_import_cycles(G, scc):
+    """Strongly connected components with more than one file, largest first."""
+    component, count = scc
+    members = {}
+    for i, c in enumerate(component):
+        members.setdefault(c, []).append(G.nodes[i])
+    cycles = [files for files in members.values() if len(files) > 1]
+    cycles.sort(key=len, reverse=True)
+    return [
+        {"size": len(files), "files": sorted(files)[:MAX_CYCLE_FILES]}
+        for files in cycles
+    ]
+
 def analyze_graph(G):
+    if not isinstance(G, CompactGraph):
+        G = CompactGraph.from_networkx(G)
     if len(G.nodes) == 0:
         return {
             "probable_entry_points": [],
             "bus_factor_risks": [],
             "terminal_modules": [],
-            "cycles_detected": False
+            "cycles_detected": False,
+            "import_cycles": []
         }
     def entry_score(node_tuple):
         node, degree = node_tuple
@@ -119,17 +493,19 @@ def analyze_graph(G):
             return "MODERATE"
         else:
             return "HIGH_RISK"
-    probable_entry_points = sorted(
-        G.out_degree,
-        key=entry_score,
-        reverse=True
-    )[:5]
+    # nlargest keeps sorted(...)[:k] tie order at O(n log k)
+    probable_entry_points = heapq.nlargest(
+        5,
+        zip(G.nodes, G.out_degrees()),
+        key=entry_score
+    )
     probable_entry_points = [node for node, _ in probable_entry_points]
-    bus_factor_risks = sorted(
-        [(node, deg) for node, deg in G.in_degree if deg > 0],
-        key=lambda x: x[1],
-        reverse=True
-    )[:5]
+    in_degrees = G.in_degrees()
+    bus_factor_risks = heapq.nlargest(
+        5,
+        ((node, deg) for node, deg in zip(G.nodes, in_degrees) if deg > 0),
+        key=lambda x: x[1]
+    )
     bus_factor_risks = [
         {
             "file": node,
@@ -137,16 +513,17 @@ def analyze_graph(G):
         }
         for node, degree in bus_factor_risks
     ]
-    terminal_modules = sorted(
-        [node for node in G.nodes if G.out_degree(node) == 0],
-        key=lambda x: G.in_degree(x),
-        reverse=True
-    )[:5]
-    cycles_detected = not nx.is_directed_acyclic_graph(G)
-    if not cycles_detected and len(G.nodes) > 0:
-        max_dependency_depth = nx.dag_longest_path_length(G)
-    else:
-        max_dependency_depth = None
+    terminal_modules = heapq.nlargest(
+        5,
+        (i for i, deg in enumerate(G.out_degrees()) if deg == 0),
+        key=lambda i: in_degrees[i]
+    )
+    terminal_modules = [G.nodes[i] for i in terminal_modules]
+    # Depth is measured on the SCC condensation so cyclic repos still get one
+    scc = G.strongly_connected_components()
+    max_dependency_depth = G.longest_path_length(scc)
+    import_cycles = summarize_import_cycles(G, scc)
+    cycles_detected = bool(import_cycles)
     architecture_health_score = compute_health_score(
         G,
         cycles_detected,
@@ -159,17 +536,19 @@ def analyze_graph(G):
         "bus_factor_risks": bus_factor_risks,
         "terminal_modules": terminal_modules,
         "cycles_detected": cycles_detected,
+        "import_cycles": import_cycles[:MAX_REPORTED_CYCLES],
         "max_dependency_depth": max_dependency_depth,
         "architecture_health_score": architecture_health_score,
         "architecture_health": architecture_health,
         "graph_stats": {
             "files": len(G.nodes),
-            "edges": len(G.edges),
-            "density": round(nx.density(G), 4)
+            "edges": G.number_of_edges(),
+            "density": round(G.density(), 4),
+            "cycle_components": len(import_cycles)
         }
     }
 def dependency_agent(repo_path):
-    graph = build_dependency_graph(repo_path)
+    graph = load_compact_graph(repo_path)
     intelligence = analyze_graph(graph)
     return intelligence
 def compute_risk_score(direct, transitive, depth):
@@ -184,9 +563,24 @@ def classify_risk(score):
     else:
         return "LOW"
 def analyze_impact(repo_path: str, changed_files: List[str]):
+    return impact_report(repo_path, changed_files)["file_breakdown"]
+
+def impact_report(repo_path: str, changed_files: List[str]):
+    """Per-file blast radius plus the union of impacted modules.
+
+    All changed files share one multi-source traversal of the reverse graph.
+    ``impacted`` maps every dependent to ``(changed roots reaching it,
+    minimum depth)``; ``graph`` is the CompactGraph the report was built on.
+    When the graph carries a reachability index, per-file stats are lookups
+    and the minimum depth is reported as None.
+    """
     print("IMPACT ANALYZER REPO PATH:", repo_path)
     print("EXISTS?", os.path.exists(repo_path))
-    G = build_dependency_graph(repo_path)
+    with ANALYSIS_STEP_SECONDS.time(step="graph_build"):
+        G = load_compact_graph(repo_path)
+    GRAPH_NODES.observe(len(G.nodes))
+    GRAPH_EDGES.observe(G.number_of_edges())
+    started = time.perf_counter()
     reverse_graph = build_reverse_graph(G)
     normalized_changed_files = []
     for f in changed_files:
@@ -204,7 +598,7 @@ def analyze_impact(repo_path: str, changed_files: List[str]):
     print("SAMPLE NODES:", list(G.nodes)[:20])
     print("CHANGED FILES:", normalized_changed_files)
     if not valid_files:
-        return [{
+        return {"graph": G, "impacted": {}, "file_breakdown": [{
             "file": "INVALID_INPUT",
             "risk_score": 0,
             "risk_level": "LOW",
@@ -214,14 +608,27 @@ def analyze_impact(repo_path: str, changed_files: List[str]):
             "error": "Changed files do not belong to analyzed repository",
             "debug_changed_files": changed_files,
             "debug_available_files": list(G.nodes)[:10]
-        }]
+        }]}
+    index = G.reachability
+    if index is not None:
+        per_root = {
+            file: (index.transitive_dependents(file), index.depth(file))
+            for file in valid_files
+        }
+        impacted = {
+            node: (roots, None)
+            for node, roots in index.dependents_of(dict.fromkeys(valid_files)).items()
+        }
+    else:
+        per_root, impacted = compute_multi_source_blast_radius(valid_files, reverse_graph)
+    ANALYSIS_STEP_SECONDS.observe(time.perf_counter() - started, step="blast_radius")
+    IMPACTED_FILES.observe(len(impacted))
     results = []
     for file in valid_files:
         if file not in G:
             continue
-        dependents, depth = compute_blast_radius(file, reverse_graph)
-        direct = len(list(reverse_graph.successors(file)))
-        transitive = len(dependents)
+        transitive, depth = per_root[file]
+        direct = G.in_degree(file)
         score = compute_risk_score(direct, transitive, depth)
         risk = classify_risk(score)
         results.append({
@@ -232,4 +639,4 @@ def analyze_impact(repo_path: str, changed_files: List[str]):
             "transitive_dependents": transitive,
             "depth": depth
         })
-    return results
\ No newline at end of file
+    return {"graph": G, "impacted": impacted, "file_breakdown": results}
\ No newline at end of file
@@ -0,0 +1,66 @@
+import re, posixpath
+from functools import lru_cache
+
+JS_EXTENSIONS = (".js", ".jsx", ".ts", ".tsx", ".mjs", ".cjs")
+# Order in which extensionless specifiers are tried, matching TS/bundler lookup
+RESOLVE_EXTENSIONS = (".ts", ".tsx", ".js", ".jsx", ".mjs", ".cjs")
+
+# One left-to-right pass: comments and string/template literals are matched
+# (and ignored) so that import-looking text inside them is never reported.
+# Each group captures a specifier; skipped tokens leave all groups empty.
+# Keywords come before their word-boundary lookbehind so every branch starts
+# with a literal, which lets the regex engine skip ahead quickly.
+_TOKEN = re.compile(
+    r"""
+      //[^\n]*
+    | /\*.*?\*/
+    | `(?:\\.|[^`\\])*`
+    | import(?<![\w$.]import)\s*\(\s*['"]([^'"\n]+)['"]
+    | (?:import(?<![\w$.]import)|export(?<![\w$.]export))\s+(?:type\s+)?[\w*{}\s,$]*?\bfrom\s*['"]([^'"\n]+)['"]
+    | import(?<![\w$.]import)\s*['"]([^'"\n]+)['"]
+    | require(?<![\w$.]require)\s*\(\s*['"]([^'"\n]+)['"]\s*\)
+    | '(?:\\.|[^'\\\n])*'
+    | "(?:\\.|[^"\\\n])*"
+    """,
+    re.DOTALL | re.VERBOSE
+)
+
+def scan_js_imports(source: str):
+    """Module specifiers from import/export-from/require/import() in ``source``."""
+    if "import" not in source and "require" not in source:
+        return []
+    return [
+        dynamic or static or side_effect or required
+        for dynamic, static, side_effect, required in _TOKEN.findall(source)
+        if dynamic or static or side_effect or required
+    ]
+
+def js_candidates(importer, specifier):
+    """Repo paths a relative specifier may refer to, in resolution order.
+
+    Bare specifiers (packages) yield nothing. Covers exact files, implied
+    extensions, ``index`` files and TS sources imported with a ``.js``
+    suffix.
+    """
+    if not specifier.startswith(("./", "../")) and specifier not in (".", ".."):
+        return ()
+    return _relative_candidates(posixpath.dirname(importer), specifier)
+
+@lru_cache(maxsize=65536)
+def _relative_candidates(base, specifier):
+    # Sibling files share a directory, so most lookups repeat across a repo
+    target = posixpath.normpath(posixpath.join(base, specifier.split("?", 1)[0]))
+    if target.startswith("../") or target == "..":
+        return ()
+    target = "" if target == "." else target
+    candidates = []
+    directory_only = specifier in (".", "..") or specifier.endswith("/")
+    if not directory_only and target.endswith(JS_EXTENSIONS):
+        candidates.append(target)
+        stem = target.rsplit(".", 1)[0]
+        candidates.extend(stem + ext for ext in RESOLVE_EXTENSIONS)
+    elif not directory_only and target:
+        candidates.extend(target + ext for ext in RESOLVE_EXTENSIONS)
+    prefix = target + "/" if target else ""
+    candidates.extend(prefix + "index" + ext for ext in RESOLVE_EXTENSIONS)
+    return tuple(dict.fromkeys(candidates))
@@ -1,6 +1,8 @@
 import json
 import re
-from core.llm import ask_llama
+from core.llm import ask_llama, aask_llama, DEFAULT_MODEL
+from core.llm_gateway import LLMUnavailable
+from core.review_cache import REVIEW_CACHE, review_cache_key
 from utils.logger import get_logger
 
 logger = get_logger("llm-review-engine")
@@ -31,23 +33,29 @@ def fallback_review_template():
         ]
     }
 
+REVIEW_TEMPERATURE = 0.1
+
+def parse_llm_response(response: str) -> dict:
+    """Parsed review; raises ValueError when it fails validation."""
+    cleaned = re.sub(r"```.*?\n", "", response)
+    cleaned = re.sub(r"```", "", cleaned).strip()
+    parsed = json.loads(cleaned)
+    if not all(k in parsed for k in REQUIRED_KEYS):
+        raise ValueError("Missing required keys")
+    if parsed["merge_readiness"] not in ["LOW", "MEDIUM", "HIGH"]:
+        raise ValueError("Invalid merge readiness value")
+    if not isinstance(parsed["recommended_actions"], list):
+        raise ValueError("recommended_actions must be list")
+    return parsed
+
 def safe_parse_llm_response(response: str) -> dict:
     try:
-        cleaned = re.sub(r"```.*?\n", "", response)
-        cleaned = re.sub(r"```", "", cleaned).strip()
-        parsed = json.loads(cleaned)
-        if not all(k in parsed for k in REQUIRED_KEYS):
-            raise ValueError("Missing required keys")
-        if parsed["merge_readiness"] not in ["LOW", "MEDIUM", "HIGH"]:
-            raise ValueError("Invalid merge readiness value")
-        if not isinstance(parsed["recommended_actions"], list):
-            raise ValueError("recommended_actions must be list")
-        return parsed
+        return parse_llm_response(response)
     except Exception as e:
         logger.warning(f"LLM JSON validation failed: {e}")
         return fallback_review_template()
 
-def generate_llm_review(pr_data: dict) -> dict:
+def build_review_messages(pr_data: dict) -> list:
     classification = pr_data.get("classification", "LOW")
     risk_score = pr_data.get("pr_risk_score", 0)
     total_files = pr_data.get("total_files_affected", 0)
@@ -55,7 +63,6 @@ def generate_llm_review(pr_data: dict) -> dict:
     modules = pr_data.get("high_risk_modules", [])
     diff_metrics = pr_data.get("diff_risk", {})
     semantic = pr_data.get("semantic_risk", {})
-    confidence_score = pr_data.get("confidence_score", 0.5)
     risk_context_text = RISK_CONTEXT.get(classification, "")
 
     system_prompt = """
@@ -100,24 +107,79 @@ Return strict JSON:
 }}
 """
 
-    try:
-        response = ask_llama(
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.1
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt}
+    ]
+
+def finalize_review(review: dict, pr_data: dict) -> dict:
+    # Copy: cached reviews are shared and must not collect warnings
+    parsed = dict(review, recommended_actions=list(review["recommended_actions"]))
+    if pr_data.get("confidence_score", 0.5) < 0.6:
+        parsed["recommended_actions"].append(
+            "⚠ AI confidence low. Mandatory human validation required."
         )
+    return parsed
 
-        parsed = safe_parse_llm_response(response)
+def _parse_review(response):
+    # Only reviews that pass validation are cached; fallbacks never are
+    try:
+        return parse_llm_response(response)
+    except Exception as e:
+        logger.warning(f"LLM JSON validation failed: {e}")
+        return None
 
-        if confidence_score < 0.6:
-            parsed["recommended_actions"].append(
-                "⚠ AI confidence low. Mandatory human validation required."
-            )
+def _store_review(key, response):
+    review = _parse_review(response)
+    if review is None:
+        return fallback_review_template()
+    REVIEW_CACHE.set(key, review)
+    return review
 
-        return parsed
+async def _astore_review(key, response):
+    review = _parse_review(response)
+    if review is None:
+        return fallback_review_template()
+    await REVIEW_CACHE.aset(key, review)
+    return review
+
+def generate_llm_review(pr_data: dict) -> dict:
+    messages = build_review_messages(pr_data)
+    key = review_cache_key(DEFAULT_MODEL, messages, REVIEW_TEMPERATURE)
+    review = REVIEW_CACHE.get(key)
+    if review is not None:
+        return finalize_review(review, pr_data)
+    try:
+        response = ask_llama(
+            messages=messages,
+            temperature=REVIEW_TEMPERATURE,
+            model=DEFAULT_MODEL
+        )
+        return finalize_review(_store_review(key, response), pr_data)
+    except LLMUnavailable as e:
+        # Open circuit, exhausted retries or deadline: no traceback needed
+        logger.warning(f"LLM unavailable, using fallback review: {e}")
+        return fallback_review_template()
+    except Exception as e:
+        logger.exception("LLM request failed")
+        return fallback_review_template()
 
+async def agenerate_llm_review(pr_data: dict) -> dict:
+    messages = build_review_messages(pr_data)
+    key = review_cache_key(DEFAULT_MODEL, messages, REVIEW_TEMPERATURE)
+    review = await REVIEW_CACHE.aget(key)
+    if review is not None:
+        return finalize_review(review, pr_data)
+    try:
+        response = await aask_llama(
+            messages=messages,
+            temperature=REVIEW_TEMPERATURE,
+            model=DEFAULT_MODEL
+        )
+        return finalize_review(await _astore_review(key, response), pr_data)
+    except LLMUnavailable as e:
+        logger.warning(f"LLM unavailable, using fallback review: {e}")
+        return fallback_review_template()
     except Exception as e:
         logger.exception("LLM request failed")
-        return fallback_review_template()
\ No newline at end of file
+        return fallback_review_template()
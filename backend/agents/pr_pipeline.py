@@ -0,0 +1,137 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+from core.pipeline import Stage
+from core.metrics import counter, histogram, SIZE_BUCKETS
+from services.repo_mirror import acheckout, REPO_CHECKOUT_MODE
+from agents.impact_engine import load_snapshot_graph
+from utils.diff_parser import parse_diff
+from agents.pr_risk_engine import build_impact_report, analyze_diff, fuse_pr_risk
+from intelligence.contextual_risk_engine import contextual_risk_score
+from agents.llm_review_engine import generate_llm_review, agenerate_llm_review
+from agents.enterprise_decision_engine import build_enterprise_decision
+from agents.hybrid_governance_engine import compute_hybrid_merge_decision
+
+DIFF_LINES = histogram("pr_diff_lines", "Diff lines parsed per PR", buckets=SIZE_BUCKETS)
+DIFF_CHARS = histogram("pr_diff_chars", "Diff characters parsed per PR", buckets=SIZE_BUCKETS)
+DIFF_FILES = histogram("pr_diff_files", "Files in a PR's diff", buckets=SIZE_BUCKETS)
+DIFF_TRUNCATED = counter("pr_diff_truncated_total", "Diffs completed from file summaries after the byte cap")
+
+@dataclass
+class PRContext:
+    """Inputs and per-stage results of one PR analysis."""
+    repo_url: str
+    changed_files: Optional[List[str]] = None
+    ref: Optional[str] = None
+    # Unified diff text or a DiffParser fed from the API stream
+    diff: Any = ""
+    # Previously analyzed head whose graph is patched instead of rebuilt
+    base_commit: Optional[str] = None
+    payload: Optional[dict] = None
+    access_token: Optional[str] = None
+    repo_path: Optional[str] = None
+    base_graph: Any = None
+    diff_parser: Any = None
+    impact: Optional[dict] = None
+    diff_risk: Optional[dict] = None
+    structural_delta: Optional[dict] = None
+    semantic_risk: Optional[dict] = None
+    pr_data: Optional[dict] = None
+    ai_analysis: Optional[dict] = None
+    enterprise: Optional[dict] = None
+    hybrid: Optional[dict] = None
+    result: Optional[dict] = None
+    comment_body: Optional[str] = None
+    timings: Dict[str, float] = field(default_factory=dict)
+    resources: Any = None
+
+async def checkout_stage(ctx):
+    # Worktree lives until the pipeline finishes; only the fetch holds the limit
+    sparse = REPO_CHECKOUT_MODE == "sparse"
+    ctx.repo_path = await ctx.resources.enter_async_context(
+        acheckout(ctx.repo_url, ctx.ref, paths=ctx.changed_files if sparse else None)
+    )
+
+def snapshot_stage(ctx):
+    ctx.base_graph = load_snapshot_graph(ctx.repo_url, ctx.base_commit)
+
+def diff_stage(ctx):
+    ctx.diff_parser = diff = parse_diff(ctx.diff)
+    ctx.diff_risk, ctx.structural_delta = analyze_diff(diff)
+    DIFF_LINES.observe(diff.lines)
+    DIFF_CHARS.observe(diff.chars)
+    DIFF_FILES.observe(len(diff.files))
+    if diff.truncated:
+        DIFF_TRUNCATED.inc()
+
+def impact_stage(ctx):
+    ctx.impact = build_impact_report(ctx.repo_path, ctx.changed_files, ctx.diff_parser, ctx.base_graph)
+
+def semantic_stage(ctx):
+    ctx.semantic_risk = contextual_risk_score(ctx.repo_path, ctx.changed_files)
+
+def fuse_stage(ctx):
+    ctx.pr_data = fuse_pr_risk(ctx.impact, ctx.diff_risk, ctx.structural_delta, ctx.semantic_risk)
+
+def llm_stage(ctx):
+    ctx.ai_analysis = generate_llm_review(ctx.pr_data)
+
+async def allm_stage(ctx):
+    ctx.ai_analysis = await agenerate_llm_review(ctx.pr_data)
+
+def enterprise_stage(ctx):
+    ctx.enterprise = build_enterprise_decision(ctx.pr_data)
+
+def hybrid_stage(ctx):
+    # The AI merge-readiness signal is one of the governance inputs
+    ctx.hybrid = compute_hybrid_merge_decision(dict(ctx.pr_data, ai_analysis=ctx.ai_analysis))
+
+def decision_stage(ctx):
+    result = dict(ctx.pr_data, ai_analysis=ctx.ai_analysis)
+    result.update(ctx.enterprise)
+    result.update(ctx.hybrid)
+    # Deterministic override: governance wins over AI
+    if result["hybrid_governance"]["governance_level"] == "CRITICAL":
+        result["ai_analysis"]["merge_readiness"] = "LOW"
+    ctx.result = result
+
+def analysis_stages(async_llm=True):
+    """Checkout through governance decision; ``ctx.result`` holds the report.
+
+    The graph, the diff layer and contextual scoring only meet in
+    ``fuse``, and the enterprise layer runs alongside the LLM review.
+    Sparse checkouts need the changed files, so they wait for them.
+    """
+    checkout_requires = ("repo_url",)
+    if REPO_CHECKOUT_MODE == "sparse":
+        checkout_requires += ("changed_files",)
+    return [
+        Stage("checkout", checkout_stage, requires=checkout_requires, provides=("repo_path",), limit="checkout"),
+        Stage("snapshot", snapshot_stage, provides=("base_graph",), run="thread"),
+        Stage("diff", diff_stage, requires=("diff",), provides=("diff_parser", "diff_risk", "structural_delta"), run="cpu"),
+        Stage(
+            "impact", impact_stage,
+            requires=("repo_path", "changed_files", "diff_parser", "base_graph"),
+            provides=("impact",), run="cpu", limit="analysis"
+        ),
+        Stage(
+            "semantic", semantic_stage,
+            requires=("repo_path", "changed_files"),
+            provides=("semantic_risk",), run="cpu", limit="analysis"
+        ),
+        Stage(
+            "fuse", fuse_stage,
+            requires=("impact", "diff_risk", "structural_delta", "semantic_risk"),
+            provides=("pr_data",)
+        ),
+        Stage(
+            "llm", allm_stage if async_llm else llm_stage,
+            requires=("pr_data",), provides=("ai_analysis",), run="thread", limit="llm"
+        ),
+        Stage("enterprise", enterprise_stage, requires=("pr_data",), provides=("enterprise",)),
+        Stage("hybrid", hybrid_stage, requires=("pr_data", "ai_analysis"), provides=("hybrid",)),
+        Stage(
+            "decision", decision_stage,
+            requires=("pr_data", "ai_analysis", "enterprise", "hybrid"),
+            provides=("result",)
+        )
+    ]
@@ -1,7 +1,7 @@
-import os, re, json, requests
-from typing import List, Dict, Any
-from agents.impact_engine import analyze_impact, build_dependency_graph
-import networkx as nx
+import os, json, requests
+from typing import List, Dict, Any, Tuple
+from utils.diff_parser import parse_diff
+from agents.impact_engine import impact_report, load_compact_graph
 from intelligence.contextual_risk_engine import contextual_risk_score
 from dotenv import load_dotenv
 load_dotenv()
@@ -9,57 +9,10 @@ GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 def extract_files_from_diff(diff_text: str):
-    files = []
-    for line in diff_text.split("\n"):
-        if line.startswith("diff --git"):
-            parts = line.split(" ")
-            if len(parts) >= 3:
-                file_path = parts[2].replace("a/", "").strip()
-                file_path = file_path.lstrip("./")
-                files.append(file_path)
-    return list(set(files))
+    return parse_diff(diff_text).changed_paths()
 
 def analyze_diff_metrics(diff_text: str) -> Dict[str, Any]:
-    import re
-    lines_added = 0
-    lines_deleted = 0
-    import_changes = 0
-    function_signature_changes = 0
-    class_changes = 0
-    for line in diff_text.split("\n"):
-        stripped = line.lstrip()
-        if stripped.startswith("+") and not stripped.startswith("+++"):
-            lines_added += 1
-            if re.search(r"\b(import|from)\b", stripped):
-                import_changes += 1
-            if re.search(r"\b(async\s+def|def)\s+\w+\(.*\):", stripped):
-                function_signature_changes += 1
-            if re.search(r"\bclass\s+\w+", stripped):
-                class_changes += 1
-        elif stripped.startswith("-") and not stripped.startswith("---"):
-            lines_deleted += 1
-            if re.search(r"\b(async\s+def|def)\s+\w+\(.*\):", stripped):
-                function_signature_changes += 1
-            if re.search(r"\bclass\s+\w+", stripped):
-                class_changes += 1
-    total_changes = lines_added + lines_deleted
-    change_intensity = min(total_changes / 500, 1.0)
-    critical_modification = min(
-        (import_changes * 0.1)
-        + (function_signature_changes * 0.25)
-        + (class_changes * 0.2),
-        1.0
-    )
-    return {
-        "lines_added": lines_added,
-        "lines_deleted": lines_deleted,
-        "total_changes": total_changes,
-        "import_changes": import_changes,
-        "function_signature_changes": function_signature_changes,
-        "class_changes": class_changes,
-        "change_intensity": change_intensity,
-        "critical_modification_score": critical_modification
-    }
+    return parse_diff(diff_text).diff_metrics()
 
 STRUCTURAL_WEIGHT = 0.6
 SEMANTIC_WEIGHT = 0.4
@@ -74,73 +27,48 @@ def classify_final_score(score):
         return "LOW"
 
 def analyze_structural_delta(diff_text: str) -> Dict[str, float]:
-    if not diff_text:
-        return {
-            "api_surface_change": 0.0,
-            "signature_change": 0.0,
-            "import_change": 0.0,
-            "cosmetic_ratio": 1.0
-        }
-    added_lines = []
-    removed_lines = []
-    for line in diff_text.splitlines():
-        if line.startswith("+") and not line.startswith("+++"):
-            added_lines.append(line[1:])
-        elif line.startswith("-") and not line.startswith("---"):
-            removed_lines.append(line[1:])
-    total_changes = len(added_lines) + len(removed_lines)
-    if total_changes == 0:
-        return {
-            "api_surface_change": 0.0,
-            "signature_change": 0.0,
-            "import_change": 0.0,
-            "cosmetic_ratio": 1.0
-        }
-    # ---- API surface detection ----
-    api_patterns = [
-        r"^def\s+\w+\(",
-        r"^class\s+\w+",
-    ]
-    api_changes = sum(
-        any(re.match(p, l.strip()) for p in api_patterns)
-        for l in added_lines + removed_lines
-    )
-    api_surface_score = min(api_changes / 5, 1.0)
-    # ---- Signature modification ----
-    signature_changes = sum(
-        "def " in l and "(" in l and ")" in l
-        for l in added_lines + removed_lines
-    )
-    signature_score = min(signature_changes / 3, 1.0)
-    # ---- Import change detection ----
-    import_changes = sum(
-        l.strip().startswith(("import ", "from "))
-        for l in added_lines + removed_lines
-    )
-    import_score = min(import_changes / 5, 1.0)
-    # ---- Cosmetic change detection ----
-    meaningful_changes = sum(
-        1
-        for l in added_lines + removed_lines
-        if l.strip() and not l.strip().startswith("#")
-    )
-    cosmetic_ratio = meaningful_changes / max(total_changes, 1)
-    return {
-        "api_surface_change": api_surface_score,
-        "signature_change": signature_score,
-        "import_change": import_score,
-        "cosmetic_ratio": cosmetic_ratio
-    }
+    return parse_diff(diff_text).structural_delta()
+
+# The stages below only share inputs, so the pipeline can run the graph
+# (build_impact_report), the diff layer and contextual scoring concurrently and
+# join them in fuse_pr_risk; calculate_pr_risk runs them one after another.
 
-def calculate_pr_risk(repo_path: str, changed_files: List[str], diff_text: str = "") -> Dict[str, Any]:
-    impacts = analyze_impact(repo_path, changed_files)
+def build_impact_report(repo_path: str, changed_files: List[str], diff=None, base_graph=None) -> Dict[str, Any]:
+    if base_graph is not None:
+        # Patch the previously analyzed snapshot instead of a full rebuild;
+        # later build_dependency_graph calls hit the cache for this commit
+        load_compact_graph(
+            repo_path,
+            base_graph=base_graph,
+            changed_files=list(changed_files) + (diff.changed_paths() if diff is not None else [])
+        )
+    return impact_report(repo_path, changed_files)
+
+def analyze_diff(diff) -> Tuple[Dict[str, Any], Dict[str, float]]:
     # ---- Diff Aware Risk Layer ----
-    diff_metrics = analyze_diff_metrics(diff_text) if diff_text else {
+    diff_metrics = diff.diff_metrics() if diff.files else {
         "change_intensity": 0,
         "critical_modification_score": 0
     }
-    structural_delta = analyze_structural_delta(diff_text)
-    if impacts and impacts[0].get("file") == "INVALID_INPUT":
+    return diff_metrics, diff.structural_delta()
+
+def calculate_pr_risk(repo_path: str, changed_files: List[str], diff_text="", base_graph=None) -> Dict[str, Any]:
+    # ``diff_text`` may also be a DiffParser already fed from a stream
+    diff = parse_diff(diff_text)
+    report = build_impact_report(repo_path, changed_files, diff, base_graph)
+    diff_metrics, structural_delta = analyze_diff(diff)
+    if is_invalid_report(report):
+        return fuse_pr_risk(report, diff_metrics, structural_delta, {})
+    semantic_results = contextual_risk_score(repo_path, changed_files)
+    return fuse_pr_risk(report, diff_metrics, structural_delta, semantic_results)
+
+def is_invalid_report(report) -> bool:
+    impacts = report["file_breakdown"]
+    return bool(impacts) and impacts[0].get("file") == "INVALID_INPUT"
+
+def fuse_pr_risk(report, diff_metrics, structural_delta, semantic_results) -> Dict[str, Any]:
+    impacts = report["file_breakdown"]
+    if is_invalid_report(report):
         return {
             "pr_risk_score": 0,
             "classification": "LOW",
@@ -151,37 +79,22 @@ def calculate_pr_risk(repo_path: str, changed_files: List[str], diff_text: str =
             "semantic_risk": {},
             "confidence_score": 0.5
         }
-    graph = build_dependency_graph(repo_path)
+    graph = report["graph"]
     total_structural_score = 0
     max_depth = 0
-    all_impacted_files = set()
-    high_risk_candidates = []
     for impact in impacts:
         total_structural_score += impact["risk_score"]
         max_depth = max(max_depth, impact["depth"])
-        root_file = impact["file"]
-        if root_file in graph:
-            # Get runtime dependents using original graph logic
-            reverse_graph = graph.reverse(copy=False)
-            runtime_impacted = {
-                f for f in nx.descendants(reverse_graph, root_file)
-                if not f.startswith(("docs_src/", "examples/", "tests/", "test/"))
-            }
-            all_impacted_files.update(runtime_impacted)
-            for module in runtime_impacted:
-                centrality = graph.in_degree(module)
-                high_risk_candidates.append((module, centrality))
-    # Unique impacted files count
+    # Union of runtime dependents, already computed by the impact traversal
     runtime_impacted = {
-        f for f in all_impacted_files
+        f for f in report["impacted"]
         if not f.startswith(("docs_src/", "examples/", "tests/", "test/"))
     }
     total_affected = len(runtime_impacted)
     # Rank high risk modules by dependency centrality
     high_risk_candidates = sorted(
-        high_risk_candidates,
-        key=lambda x: x[1],
-        reverse=True
+        ((module, graph.in_degree(module)) for module in runtime_impacted),
+        key=lambda x: (-x[1], x[0])
     )
     high_risk_modules = [m[0] for m in high_risk_candidates[:3]]
     # Average structural score
@@ -200,8 +113,6 @@ def calculate_pr_risk(repo_path: str, changed_files: List[str], diff_text: str =
     print("STRUCTURAL DELTA:", structural_delta)
     structural_norm = base_structural * (0.5 + structural_amplifier) * cosmetic_dampener
     structural_norm = min(structural_norm, 1.0)
-    semantic_results = contextual_risk_score(repo_path, changed_files)
-
     try:
         semantic_score_raw = float(semantic_results.get("semantic_score", 0))
     except (ValueError, TypeError):
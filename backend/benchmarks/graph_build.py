@@ -0,0 +1,29 @@
+"""Dependency graph build time across synthetic repository sizes.
+
+Run from ``backend/``: ``python -m benchmarks.graph_build [sizes...]``
+"""
+import sys, time, tempfile, shutil
+from benchmarks.synthetic_repo import generate_repo
+from agents.impact_engine import build_dependency_graph
+
+DEFAULT_SIZES = [500, 1000, 2000, 4000, 8000]
+
+def run(sizes):
+    rows = []
+    for size in sizes:
+        root = tempfile.mkdtemp(prefix="graph-bench-")
+        try:
+            generate_repo(root, size)
+            start = time.perf_counter()
+            graph = build_dependency_graph(root)
+            elapsed = time.perf_counter() - start
+            rows.append((size, len(graph.edges), elapsed))
+        finally:
+            shutil.rmtree(root)
+    print(f"{'files':>8} {'edges':>8} {'seconds':>9} {'us/file':>9}")
+    for size, edges, elapsed in rows:
+        print(f"{size:>8} {edges:>8} {elapsed:>9.3f} {elapsed / size * 1e6:>9.1f}")
+    return rows
+
+if __name__ == "__main__":
+    run([int(s) for s in sys.argv[1:]] or DEFAULT_SIZES)
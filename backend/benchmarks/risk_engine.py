@@ -0,0 +1,181 @@
+"""Time and peak memory of each analysis stage across synthetic repository sizes.
+
+Run from ``backend/``::
+
+    python -m benchmarks.risk_engine --sizes 100 1000 10000 --output bench.json
+    python -m benchmarks.risk_engine --compare baseline.json bench.json
+
+Every stage runs with the in-process caches cleared ("cold") unless its
+name ends in "_warm". Time comes from a plain run; peak memory from a
+second run under tracemalloc, which would otherwise distort the timing.
+Results are written as JSON; ``--compare`` exits non-zero when a stage got
+slower than ``--threshold`` times the baseline.
+"""
+import os, sys, io, json, time, shutil, platform, argparse, tempfile, tracemalloc, subprocess
+from contextlib import redirect_stdout
+from benchmarks.synthetic_repo import generate_repo, generate_diff
+from core.bounded_cache import CACHES
+from agents.impact_engine import build_dependency_graph, analyze_graph, analyze_impact
+from utils.diff_parser import parse_diff
+from agents.pr_risk_engine import calculate_pr_risk, analyze_diff
+from intelligence.contextual_risk_engine import contextual_risk_score
+
+DEFAULT_SIZES = [100, 1000, 5000, 10000, 50000]
+
+def clear_caches():
+    for cache in CACHES.values():
+        cache.clear()
+
+def stages(root, changed, diff_text):
+    """``(name, fn, cold)`` in run order; warm stages follow their cold twin."""
+    graph = {}
+    def build():
+        graph["G"] = build_dependency_graph(root)
+    return [
+        ("build_dependency_graph", build, True),
+        ("analyze_graph", lambda: analyze_graph(graph["G"]), True),
+        ("analyze_impact", lambda: analyze_impact(root, changed), True),
+        ("analyze_impact_warm", lambda: analyze_impact(root, changed), False),
+        ("diff_metrics", lambda: analyze_diff(parse_diff(diff_text)), True),
+        ("contextual_risk_score", lambda: contextual_risk_score(root, changed), True),
+        ("calculate_pr_risk", lambda: calculate_pr_risk(root, changed, diff_text), True),
+        ("calculate_pr_risk_warm", lambda: calculate_pr_risk(root, changed, diff_text), False)
+    ], graph
+
+def measure(fn, cold, memory):
+    if cold:
+        clear_caches()
+    # The engines print progress; keep it out of the report
+    with redirect_stdout(io.StringIO()):
+        if not memory:
+            started = time.perf_counter()
+            fn()
+            return time.perf_counter() - started
+        tracemalloc.start()
+        try:
+            fn()
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+def run_size(size, args):
+    root = tempfile.mkdtemp(prefix="risk-bench-")
+    try:
+        started = time.perf_counter()
+        paths = generate_repo(
+            root, size,
+            package_size=args.package_size,
+            fan_out=args.fan_out,
+            seed=args.seed,
+            depth=args.depth,
+            cycle_rate=args.cycle_rate,
+            file_size=args.file_size
+        )
+        generated = time.perf_counter() - started
+        changed, diff_text = generate_diff(root, paths, changed=args.changed, seed=args.seed)
+        plan, graph = stages(root, changed, diff_text)
+        rows = []
+        for name, fn, cold in plan:
+            seconds = min(measure(fn, cold, memory=False) for _ in range(args.repeat))
+            peak = None if args.no_memory else measure(fn, cold, memory=True)
+            rows.append({"files": size, "stage": name, "seconds": round(seconds, 6), "peak_bytes": peak})
+        G = graph["G"]
+        meta = {
+            "files": size,
+            "edges": G.number_of_edges(),
+            "diff_bytes": len(diff_text),
+            "changed_files": len(changed),
+            "generate_seconds": round(generated, 3)
+        }
+        return meta, rows
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, timeout=10
+        ).stdout.strip() or None
+    except (OSError, subprocess.TimeoutExpired):
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    }
+
+def run(args):
+    report = {
+        "environment": environment(),
+        "parameters": {
+            key: getattr(args, key)
+            for key in ("package_size", "fan_out", "depth", "cycle_rate", "file_size", "changed", "seed", "repeat")
+        },
+        "repos": [],
+        "results": []
+    }
+    for size in args.sizes:
+        meta, rows = run_size(size, args)
+        report["repos"].append(meta)
+        report["results"].extend(rows)
+        print(f"{size} files, {meta['edges']} edges (generated in {meta['generate_seconds']}s)", file=sys.stderr)
+        for row in rows:
+            peak = f"{row['peak_bytes'] / 2 ** 20:10.1f} MiB" if row["peak_bytes"] is not None else ""
+            print(f"  {row['stage']:<24} {row['seconds']:>10.4f}s {peak}", file=sys.stderr)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}", file=sys.stderr)
+    return report
+
+def compare(baseline_path, current_path, threshold):
+    """Print per-stage ratios; returns the (files, stage) pairs that regressed."""
+    with open(baseline_path) as f:
+        baseline = {(r["files"], r["stage"]): r for r in json.load(f)["results"]}
+    with open(current_path) as f:
+        current = {(r["files"], r["stage"]): r for r in json.load(f)["results"]}
+    regressions = []
+    print(f"{'files':>8} {'stage':<24} {'base s':>10} {'now s':>10} {'ratio':>7} {'mem ratio':>9}")
+    for key in sorted(baseline.keys() & current.keys()):
+        old, new = baseline[key], current[key]
+        ratio = new["seconds"] / old["seconds"] if old["seconds"] else float("inf")
+        mem = ""
+        if old.get("peak_bytes") and new.get("peak_bytes") is not None:
+            mem_ratio = new["peak_bytes"] / old["peak_bytes"]
+            mem = f"{mem_ratio:.2f}"
+            if mem_ratio > threshold:
+                regressions.append(key)
+        flag = " <-" if ratio > threshold else ""
+        if ratio > threshold:
+            regressions.append(key)
+        print(f"{key[0]:>8} {key[1]:<24} {old['seconds']:>10.4f} {new['seconds']:>10.4f} {ratio:>7.2f} {mem:>9}{flag}")
+    return sorted(set(regressions))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--package-size", type=int, default=50)
+    parser.add_argument("--fan-out", type=int, default=5)
+    parser.add_argument("--depth", type=int, default=2)
+    parser.add_argument("--cycle-rate", type=float, default=0.01)
+    parser.add_argument("--file-size", type=int, default=2048, help="approximate bytes per module")
+    parser.add_argument("--changed", type=int, default=20, help="files touched by the synthetic diff")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=1, help="timed runs per stage; the fastest is kept")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"))
+    parser.add_argument("--threshold", type=float, default=1.25)
+    args = parser.parse_args(argv)
+    if args.compare:
+        regressions = compare(*args.compare, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} stage(s) regressed beyond {args.threshold}x", file=sys.stderr)
+            return 1
+        return 0
+    run(args)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+import os, random
+
+def _package_path(index, depth, branching=4):
+    # ``depth`` directory levels below app/, e.g. pkg3/sub1/sub0 for depth 3
+    parts = []
+    for _ in range(depth - 1):
+        parts.append(f"sub{index % branching}")
+        index //= branching
+    parts.append(f"pkg{index}")
+    return "/".join(reversed(parts))
+
+def _pad(lines, i, file_size):
+    # Filler functions until the module reaches roughly ``file_size`` bytes
+    size = sum(len(line) + 1 for line in lines)
+    k = 0
+    while size < file_size:
+        block = ["", f"def helper_{i}_{k}(value, scale={k}):", f"    return value * scale + {k}"]
+        lines.extend(block)
+        size += sum(len(line) + 1 for line in block)
+        k += 1
+
+def generate_repo(root, files, package_size=50, fan_out=5, seed=0, depth=1, cycle_rate=0.0, file_size=0):
+    """Write a deterministic synthetic Python repository under ``root``.
+
+    Modules are grouped into packages of ``package_size`` files nested
+    ``depth`` directories deep; each module imports ``fan_out`` earlier
+    modules, mixing absolute and relative forms. With ``cycle_rate`` that
+    fraction of modules also imports, and is imported by, a nearby earlier
+    module, closing an import cycle. Modules are padded with filler functions to
+    about ``file_size`` bytes. Returns the list of repo-relative paths.
+    """
+    rng = random.Random(seed)
+    modules = []
+    for i in range(files):
+        package = _package_path(i // package_size, depth)
+        modules.append((package, f"mod{i}"))
+    for package in {p for p, _ in modules}:
+        parts = package.split("/")
+        for level in range(1, len(parts) + 1):
+            directory = os.path.join(root, "app", *parts[:level])
+            os.makedirs(directory, exist_ok=True)
+            open(os.path.join(directory, "__init__.py"), "a").close()
+    imports = []
+    for i, (package, name) in enumerate(modules):
+        lines = []
+        for j in rng.sample(range(i), min(fan_out, i)):
+            dep_package, dep_name = modules[j]
+            if dep_package == package and rng.random() < 0.5:
+                lines.append(f"from . import {dep_name}")
+            else:
+                lines.append(f"import app.{dep_package.replace('/', '.')}.{dep_name}")
+        imports.append(lines)
+    if cycle_rate > 0:
+        for i, (package, name) in enumerate(modules):
+            if i and rng.random() < cycle_rate:
+                j = rng.randrange(max(0, i - fan_out * 4), i)
+                imports[j].append(f"import app.{package.replace('/', '.')}.{name}")
+                imports[i].append(f"import app.{modules[j][0].replace('/', '.')}.{modules[j][1]}")
+    paths = []
+    for i, (package, name) in enumerate(modules):
+        lines = list(imports[i])
+        lines.append("")
+        lines.append(f"def handler_{i}(value):")
+        lines.append("    return value")
+        _pad(lines, i, file_size)
+        path = f"app/{package}/{name}.py"
+        with open(os.path.join(root, path), "w") as f:
+            f.write("\n".join(lines) + "\n")
+        paths.append(path)
+    return paths
+
+def generate_diff(root, paths, changed=10, context=20, added=8, signature_rate=0.3, import_rate=0.3, seed=0):
+    """Unified diff modifying ``changed`` of ``paths`` in the repo at ``root``.
+
+    Each file gets one hunk over its first ``context`` lines plus ``added``
+    new lines; some hunks change the handler's signature or add an import,
+    so the structural-delta counters see realistic signals. The files on
+    disk are left untouched. Returns ``(changed_paths, diff_text)``.
+    """
+    rng = random.Random(seed)
+    selected = sorted(rng.sample(paths, min(changed, len(paths))))
+    out = []
+    for path in selected:
+        with open(os.path.join(root, path)) as f:
+            old = f.read().splitlines()[:context]
+        body = []
+        signature = rng.random() < signature_rate
+        for line in old:
+            if signature and line.startswith("def handler_"):
+                body.append(f"-{line}")
+                body.append(f"+{line[:-len('(value):')]}(value, strict=False):")
+            else:
+                body.append(f" {line}")
+        additions = [f"    # adjusted {k}" for k in range(added)]
+        if rng.random() < import_rate:
+            additions.insert(0, f"import app.{rng.choice(paths)[4:-3].replace('/', '.')}")
+        body.extend(f"+{line}" for line in additions)
+        new_count = len(old) + len(additions)
+        out.append(f"diff --git a/{path} b/{path}")
+        out.append("index 1111111..2222222 100644")
+        out.append(f"--- a/{path}")
+        out.append(f"+++ b/{path}")
+        out.append(f"@@ -1,{len(old)} +1,{new_count} @@")
+        out.extend(body)
+    return selected, "\n".join(out) + "\n"
@@ -1,8 +1,22 @@
-import networkx as nx
 from collections import deque
-def build_reverse_graph(G: nx.DiGraph):
+from compact_graph import CompactGraph
+def build_reverse_graph(G):
+    if isinstance(G, CompactGraph):
+        return G.reverse()
     return G.reverse(copy=False)
 def compute_blast_radius(target_file, reverse_graph):
+    if isinstance(reverse_graph, CompactGraph):
+        start = reverse_graph.ids[target_file]
+        depths = reverse_graph.bfs([start])
+        nodes = reverse_graph.nodes
+        visited = {nodes[i] for i in depths if i != start}
+        max_depth = max(depths.values())
+        # Like the BFS below, a file on an import cycle is its own dependent
+        back = reverse_graph.return_depth(start, depths)
+        if back is not None:
+            visited.add(target_file)
+            max_depth = max(max_depth, back)
+        return visited, max_depth
     visited = set()
     queue = deque([(target_file, 0)])
     max_depth = 0
@@ -14,4 +28,68 @@ def compute_blast_radius(target_file, reverse_graph):
                 next_depth = depth + 1
                 max_depth = max(max_depth, next_depth)
                 queue.append((dependent, next_depth))
-    return visited, max_depth
\ No newline at end of file
+    return visited, max_depth
+
+def compute_multi_source_blast_radius(roots, reverse_graph: CompactGraph):
+    """Blast radius of every root from a single traversal of ``reverse_graph``.
+
+    Each root gets one bit; bit masks flow level by level, so a node is
+    expanded again only when a root reaches it for the first time. Returns
+    ``(per_root, reached)``: ``per_root[root] = (dependents, depth)`` matches
+    compute_blast_radius for that root alone (a root on an import cycle
+    counts as its own dependent), and ``reached[node] = (roots, min_depth)``
+    covers the union of all dependents.
+    """
+    ids = reverse_graph.ids
+    nodes = reverse_graph.nodes
+    offsets, targets = reverse_graph.out_offsets, reverse_graph.out_targets
+    roots = list(dict.fromkeys(r for r in roots if r in ids))
+    seen = {}
+    frontier = {}
+    root_bits = {}
+    for k, root in enumerate(roots):
+        i = ids[root]
+        root_bits[i] = 1 << k
+        seen[i] = seen.get(i, 0) | (1 << k)
+        frontier[i] = seen[i]
+    # Depth at which a root's own traversal first comes back to it
+    cycle_depth = {}
+    counts = [0] * len(roots)
+    depths = [0] * len(roots)
+    min_depth = {}
+    depth = 0
+    while frontier:
+        depth += 1
+        next_frontier = {}
+        for v, mask in frontier.items():
+            for u in targets[offsets[v]:offsets[v + 1]]:
+                bit = root_bits.get(u)
+                if bit is not None and mask & bit and u not in cycle_depth:
+                    cycle_depth[u] = depth
+                new = mask & ~seen.get(u, 0)
+                if new:
+                    seen[u] = seen.get(u, 0) | new
+                    next_frontier[u] = next_frontier.get(u, 0) | new
+        for u, new in next_frontier.items():
+            if u not in min_depth:
+                min_depth[u] = depth
+            while new:
+                low = new & -new
+                k = low.bit_length() - 1
+                counts[k] += 1
+                depths[k] = depth
+                new ^= low
+        frontier = next_frontier
+    for u, d in cycle_depth.items():
+        k = root_bits[u].bit_length() - 1
+        counts[k] += 1
+        depths[k] = max(depths[k], d)
+    per_root = {root: (counts[k], depths[k]) for k, root in enumerate(roots)}
+    reached = {}
+    for u, d in min_depth.items():
+        mask = seen[u]
+        reached[nodes[u]] = (
+            [root for k, root in enumerate(roots) if mask >> k & 1 and ids[root] != u],
+            d
+        )
+    return per_root, reached
@@ -0,0 +1,223 @@
+import sys
+from array import array
+from collections import deque
+
+def _csr(n, edges, reverse=False):
+    # Counting sort of edges by source (or target) into offsets/targets arrays
+    counts = [0] * (n + 1)
+    for a, b in edges:
+        counts[(b if reverse else a) + 1] += 1
+    for i in range(n):
+        counts[i + 1] += counts[i]
+    offsets = array("i", counts)
+    targets = array("i", [0]) * len(edges)
+    cursor = counts[:-1]
+    for a, b in edges:
+        src, dst = (b, a) if reverse else (a, b)
+        targets[cursor[src]] = dst
+        cursor[src] += 1
+    return offsets, targets
+
+class CompactGraph:
+    """Immutable directed graph with integer node ids and CSR adjacency.
+
+    Forward (``u -> v`` means u imports v) and reverse adjacency are stored
+    as int32 offset/target arrays, so a cached graph costs a few bytes per
+    edge instead of the nested dicts of a ``networkx.DiGraph``. Path strings
+    are interned and only used at the API boundary.
+    """
+    __slots__ = ("nodes", "ids", "out_offsets", "out_targets", "in_offsets", "in_targets", "reachability")
+
+    def __init__(self, nodes, edges):
+        self.nodes = [sys.intern(node) for node in nodes]
+        self.ids = {node: i for i, node in enumerate(self.nodes)}
+        edges = list(edges)
+        self.out_offsets, self.out_targets = _csr(len(self.nodes), edges)
+        self.in_offsets, self.in_targets = _csr(len(self.nodes), edges, reverse=True)
+        self.reachability = None
+
+    @classmethod
+    def from_networkx(cls, G):
+        ids = {node: i for i, node in enumerate(G.nodes)}
+        return cls(G.nodes, ((ids[a], ids[b]) for a, b in G.edges))
+
+    def reverse(self):
+        """Graph with every edge flipped; shares the underlying arrays."""
+        rev = CompactGraph.__new__(CompactGraph)
+        rev.nodes = self.nodes
+        rev.ids = self.ids
+        rev.out_offsets, rev.out_targets = self.in_offsets, self.in_targets
+        rev.in_offsets, rev.in_targets = self.out_offsets, self.out_targets
+        rev.reachability = None
+        return rev
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __contains__(self, node):
+        return node in self.ids
+
+    def number_of_edges(self):
+        return len(self.out_targets)
+
+    def out_degree(self, node):
+        i = self.ids[node]
+        return self.out_offsets[i + 1] - self.out_offsets[i]
+
+    def in_degree(self, node):
+        i = self.ids[node]
+        return self.in_offsets[i + 1] - self.in_offsets[i]
+
+    def out_degrees(self):
+        offsets = self.out_offsets
+        return [offsets[i + 1] - offsets[i] for i in range(len(self.nodes))]
+
+    def in_degrees(self):
+        offsets = self.in_offsets
+        return [offsets[i + 1] - offsets[i] for i in range(len(self.nodes))]
+
+    def successor_ids(self, i):
+        return self.out_targets[self.out_offsets[i]:self.out_offsets[i + 1]]
+
+    def successors(self, node):
+        nodes = self.nodes
+        return [nodes[j] for j in self.successor_ids(self.ids[node])]
+
+    def predecessors(self, node):
+        i = self.ids[node]
+        nodes = self.nodes
+        return [nodes[j] for j in self.in_targets[self.in_offsets[i]:self.in_offsets[i + 1]]]
+
+    def bfs(self, sources):
+        """Shortest hop count from ``sources`` (node ids) to every reachable id.
+
+        Sources themselves are at depth 0 and are included in the result.
+        """
+        offsets, targets = self.out_offsets, self.out_targets
+        depth = {s: 0 for s in sources}
+        queue = deque(depth)
+        while queue:
+            current = queue.popleft()
+            next_depth = depth[current] + 1
+            for j in targets[offsets[current]:offsets[current + 1]]:
+                if j not in depth:
+                    depth[j] = next_depth
+                    queue.append(j)
+        return depth
+
+    def return_depth(self, i, depth):
+        """Hops of the shortest path from ``i`` back to itself, or None.
+
+        ``depth`` is ``bfs([i])``; a node on a cycle is reached again one hop
+        after the nearest of its predecessors.
+        """
+        back = [depth[j] for j in self.in_targets[self.in_offsets[i]:self.in_offsets[i + 1]] if j in depth]
+        return min(back) + 1 if back else None
+
+    def descendants(self, node):
+        """Names of all nodes reachable from ``node``, excluding ``node``."""
+        i = self.ids[node]
+        nodes = self.nodes
+        return {nodes[j] for j in self.bfs([i]) if j != i}
+
+    def strongly_connected_components(self):
+        """Iterative Tarjan; returns ``(component_of, count)``.
+
+        Components are numbered in the order Tarjan completes them, which is
+        a reverse topological order of the condensation: every edge between
+        components goes from a higher number to a lower one.
+        """
+        offsets, targets = self.out_offsets, self.out_targets
+        n = len(self.nodes)
+        index = [-1] * n
+        low = [0] * n
+        component = [-1] * n
+        stack = []
+        count = 0
+        counter = 0
+        for start in range(n):
+            if index[start] != -1:
+                continue
+            index[start] = low[start] = counter
+            counter += 1
+            stack.append(start)
+            work = [(start, offsets[start])]
+            while work:
+                v, pos = work[-1]
+                if pos < offsets[v + 1]:
+                    work[-1] = (v, pos + 1)
+                    w = targets[pos]
+                    if index[w] == -1:
+                        index[w] = low[w] = counter
+                        counter += 1
+                        stack.append(w)
+                        work.append((w, offsets[w]))
+                    elif component[w] == -1 and index[w] < low[v]:
+                        low[v] = index[w]
+                    continue
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    if low[v] < low[parent]:
+                        low[parent] = low[v]
+                if low[v] == index[v]:
+                    while True:
+                        w = stack.pop()
+                        component[w] = count
+                        if w == v:
+                            break
+                    count += 1
+        return component, count
+
+    def topological_order(self):
+        """Node ids in topological order, or None when the graph has a cycle."""
+        offsets, targets = self.out_offsets, self.out_targets
+        indegree = self.in_degrees()
+        order = [i for i, d in enumerate(indegree) if d == 0]
+        for current in order:
+            for j in targets[offsets[current]:offsets[current + 1]]:
+                indegree[j] -= 1
+                if indegree[j] == 0:
+                    order.append(j)
+        return order if len(order) == len(self.nodes) else None
+
+    def longest_path_length(self, scc=None):
+        """Edges on the longest path once import cycles are collapsed.
+
+        Runs on the strongly connected component condensation, so it is
+        linear and defined for cyclic graphs; for a DAG it equals the plain
+        longest path. ``scc`` may pass a precomputed
+        strongly_connected_components() result.
+        """
+        component, count = scc or self.strongly_connected_components()
+        offsets, targets = self.out_offsets, self.out_targets
+        nodes_of = [[] for _ in range(count)]
+        for i, c in enumerate(component):
+            nodes_of[c].append(i)
+        longest = [0] * count
+        # Tarjan numbering: edges leave a component for lower numbers only
+        for c in range(count):
+            best = 0
+            for i in nodes_of[c]:
+                for j in targets[offsets[i]:offsets[i + 1]]:
+                    d = component[j]
+                    if d != c and longest[d] + 1 > best:
+                        best = longest[d] + 1
+            longest[c] = best
+        return max(longest, default=0)
+
+    def density(self):
+        n = len(self.nodes)
+        if n < 2:
+            return 0
+        return self.number_of_edges() / (n * (n - 1))
+
+    def nbytes(self):
+        """Approximate memory held by this graph, for cache accounting."""
+        arrays = (self.out_offsets, self.out_targets, self.in_offsets, self.in_targets)
+        size = sum(a.buffer_info()[1] * a.itemsize for a in arrays)
+        size += sys.getsizeof(self.nodes) + sys.getsizeof(self.ids)
+        size += sum(sys.getsizeof(node) for node in self.nodes)
+        if self.reachability is not None:
+            size += self.reachability.nbytes()
+        return size
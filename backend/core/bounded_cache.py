@@ -0,0 +1,137 @@
+import sys, time, threading
+from collections import OrderedDict
+from core.metrics import register_collector
+
+# Every named cache registers here so its counters can be scraped
+CACHES = {}
+
+def estimate_size(value):
+    # Cached objects that know their footprint (CompactGraph) report it
+    if hasattr(value, "nbytes"):
+        return value.nbytes()
+    return sys.getsizeof(value)
+
+class BoundedCache:
+    """Thread-safe in-process cache with entry, byte and TTL limits.
+
+    ``policy`` is "lru" (evict least recently used) or "lfu" (evict least
+    frequently used, oldest first on ties). A single value larger than
+    ``max_bytes`` is not cached at all.
+    """
+    def __init__(self, name, max_entries=None, max_bytes=None, ttl=None, policy="lru", sizeof=estimate_size):
+        if policy not in ("lru", "lfu"):
+            raise ValueError(f"Unknown eviction policy: {policy}")
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.policy = policy
+        self.sizeof = sizeof
+        self._entries = OrderedDict()  # key -> [value, size, expires_at, hits]
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        CACHES[name] = self
+
+    def _drop(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry[1]
+
+    def _evict_one(self):
+        if self.policy == "lfu" and len(self._entries) > 1:
+            # Never evict the entry just inserted; it has had no chance to be hit
+            newest = next(reversed(self._entries))
+            key = min(
+                (k for k in self._entries if k != newest),
+                key=lambda k: self._entries[k][3]
+            )
+        else:
+            key = next(iter(self._entries))
+        self._drop(key)
+        self.evictions += 1
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            if entry[2] is not None and entry[2] <= time.monotonic():
+                self._drop(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            entry[3] += 1
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value):
+        size = self.sizeof(value)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+            expires_at = time.monotonic() + self.ttl if self.ttl else None
+            self._entries[key] = [value, size, expires_at, 0]
+            self._bytes += size
+            while self._entries and (
+                (self.max_entries is not None and len(self._entries) > self.max_entries)
+                or (self.max_bytes is not None and self._bytes > self.max_bytes)
+            ):
+                self._evict_one()
+
+    def pop(self, key, default=None):
+        with self._lock:
+            if key not in self._entries:
+                return default
+            value = self._entries[key][0]
+            self._drop(key)
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and (entry[2] is None or entry[2] > time.monotonic())
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+                "policy": self.policy,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
+
+def _collect_caches():
+    stats = {name: cache.stats() for name, cache in list(CACHES.items())}
+    for key, kind, help in (
+        ("hits", "counter", "Cache lookups that found a live entry"),
+        ("misses", "counter", "Cache lookups that found nothing or an expired entry"),
+        ("evictions", "counter", "Entries evicted to respect entry or byte limits"),
+        ("expirations", "counter", "Entries dropped after their TTL"),
+        ("entries", "gauge", "Entries currently cached"),
+        ("bytes", "gauge", "Estimated bytes currently cached")
+    ):
+        name = f"cache_{key}_total" if kind == "counter" else f"cache_{key}"
+        yield name, kind, help, [({"cache": cache}, s[key]) for cache, s in sorted(stats.items())]
+
+register_collector(_collect_caches)
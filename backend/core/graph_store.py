@@ -0,0 +1,189 @@
+import os, json, time, hashlib, threading, subprocess, tempfile
+from core.metrics import counter
+from utils.logger import get_logger
+
+logger = get_logger("graph-store")
+
+GRAPH_CACHE_DIR = os.getenv(
+    "GRAPH_CACHE_DIR",
+    os.path.join(tempfile.gettempdir(), "pr-risk-graph-cache")
+)
+# Bump whenever import extraction or resolution changes so stale entries
+# from older workers are never read back
+GRAPH_CACHE_VERSION = "v2"
+# Disk budget for cached imports and graphs: entries unread for
+# GRAPH_STORE_MAX_AGE seconds go first, then least recently used ones
+GRAPH_STORE_MAX_BYTES = int(os.getenv("GRAPH_STORE_MAX_BYTES", 2 * 1024 ** 3))
+GRAPH_STORE_MAX_AGE = float(os.getenv("GRAPH_STORE_MAX_AGE", 7 * 24 * 3600))
+GRAPH_STORE_PRUNE_INTERVAL = float(os.getenv("GRAPH_STORE_PRUNE_INTERVAL", 300))
+
+GRAPH_STORE_PRUNED = counter("graph_store_pruned_files_total", "Cached import and graph files deleted by pruning")
+
+_prune_lock = threading.Lock()
+_last_prune = 0.0
+
+def _git(repo_path, *args):
+    result = subprocess.run(
+        ["git", "-C", repo_path, *args],
+        capture_output=True,
+        text=True,
+        timeout=30
+    )
+    if result.returncode != 0:
+        return None
+    return result.stdout
+
+def normalize_repo_url(url: str) -> str:
+    # Drop credentials (x-access-token:...@) and the .git suffix so HTTPS
+    # clones with and without tokens share cache entries
+    url = url.strip()
+    if "://" in url and "@" in url.split("://", 1)[1].split("/", 1)[0]:
+        scheme, rest = url.split("://", 1)
+        url = scheme + "://" + rest.split("@", 1)[1]
+    if url.endswith(".git"):
+        url = url[:-4]
+    return url.rstrip("/").lower()
+
+def repo_key(url: str) -> str:
+    return hashlib.sha256(normalize_repo_url(url).encode()).hexdigest()[:32]
+
+def repo_snapshot(repo_path: str):
+    """Identify a checkout by repository and head commit.
+
+    Returns ``{"repo", "commit", "blobs"}`` where ``blobs`` maps every tracked
+    repo-relative path to its git blob SHA, or None when ``repo_path`` is not
+    a git checkout with an origin remote.
+    """
+    try:
+        commit = _git(repo_path, "rev-parse", "HEAD")
+        remote = _git(repo_path, "remote", "get-url", "origin")
+        listing = _git(repo_path, "ls-files", "-s", "-z")
+    except (OSError, subprocess.TimeoutExpired) as e:
+        logger.warning(f"Snapshot lookup failed for {repo_path}: {e}")
+        return None
+    if not commit or not remote or listing is None:
+        return None
+    blobs = {}
+    for entry in listing.split("\0"):
+        if not entry:
+            continue
+        meta, path = entry.split("\t", 1)
+        blobs[path] = meta.split(" ")[1]
+    return {
+        "repo": repo_key(remote),
+        "commit": commit.strip(),
+        "blobs": blobs
+    }
+
+def _atomic_write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def _read_json(path):
+    try:
+        with open(path) as f:
+            data = json.load(f)
+        # mtime doubles as last use, so pruning keeps hot entries
+        os.utime(path)
+        return data
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Discarding unreadable cache entry {path}: {e}")
+        return None
+
+def _imports_path(blob, kind):
+    return os.path.join(GRAPH_CACHE_DIR, GRAPH_CACHE_VERSION, "imports", kind, blob[:2], blob + ".json")
+
+def _graph_path(repo, commit):
+    return os.path.join(GRAPH_CACHE_DIR, GRAPH_CACHE_VERSION, "graphs", repo, commit + ".json")
+
+def load_imports(blob, kind="py"):
+    # ``kind`` names the extractor ("py" or "js"): equal blobs under different
+    # extensions are parsed differently
+    imports = _read_json(_imports_path(blob, kind))
+    return tuple(imports) if imports is not None else None
+
+def save_imports(blob, imports, kind="py"):
+    try:
+        _atomic_write_json(_imports_path(blob, kind), list(imports))
+    except OSError as e:
+        logger.warning(f"Could not cache imports for blob {blob}: {e}")
+
+def load_graph(repo, commit):
+    """Return ``(files, edges)`` for a cached snapshot, or None.
+
+    ``files`` is a list of ``(path, blob, imports)`` in graph node order and
+    ``edges`` a list of ``(source_index, target_index)`` pairs.
+    """
+    data = _read_json(_graph_path(repo, commit))
+    if data is None:
+        return None
+    files = [(path, blob, tuple(imports)) for path, blob, imports in data["files"]]
+    return files, data["edges"]
+
+def save_graph(repo, commit, files, edges):
+    try:
+        _atomic_write_json(_graph_path(repo, commit), {
+            "files": [[path, blob, list(imports)] for path, blob, imports in files],
+            "edges": edges
+        })
+    except OSError as e:
+        logger.warning(f"Could not cache graph for {commit}: {e}")
+    # Once per analyzed snapshot, rate limited: walking the store isn't free
+    maybe_prune_store()
+
+def maybe_prune_store():
+    global _last_prune
+    with _prune_lock:
+        if time.monotonic() - _last_prune < GRAPH_STORE_PRUNE_INTERVAL:
+            return
+        _last_prune = time.monotonic()
+    prune_store()
+
+def prune_store(max_bytes=None, max_age=None):
+    """Delete store entries unread for ``max_age`` seconds, then the least
+    recently used ones until the rest fit ``max_bytes``.
+
+    Readers treat a vanished entry as a cache miss, so pruning needs no
+    lock. Returns the number of files removed.
+    """
+    max_bytes = GRAPH_STORE_MAX_BYTES if max_bytes is None else max_bytes
+    max_age = GRAPH_STORE_MAX_AGE if max_age is None else max_age
+    entries = []
+    for root, _, names in os.walk(GRAPH_CACHE_DIR):
+        for name in names:
+            # In-flight atomic writes end in .tmp
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+    entries.sort()
+    total = sum(size for _, size, _ in entries)
+    cutoff = time.time() - max_age
+    removed = 0
+    for mtime, size, path in entries:
+        if mtime >= cutoff and total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+    if removed:
+        GRAPH_STORE_PRUNED.inc(removed)
+        logger.info(f"Pruned {removed} graph store entries ({total} bytes kept)")
+    return removed
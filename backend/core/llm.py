@@ -1,13 +1,69 @@
-import os
-from groq import Groq
+import os, time
+from groq import Groq, AsyncGroq
 from dotenv import load_dotenv
+from core.llm_gateway import LLMGateway, LLM_DEADLINE
+from core.metrics import counter, histogram, register_collector
 load_dotenv()
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
-def ask_llama(messages, temperature=0.2, model="llama-3.3-70b-versatile"):
-    completion = client.chat.completions.create(
-        model=model,
-        messages=messages,
-        temperature=temperature,
-        max_tokens=2000
-    )
-    return completion.choices[0].message.content
\ No newline at end of file
+# Point at a local fake chat-completions server in tests
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL") or None
+# Retries and timeouts belong to the gateway, not the SDK
+client = Groq(api_key=os.getenv("GROQ_API_KEY"), base_url=GROQ_BASE_URL, max_retries=0, timeout=LLM_DEADLINE)
+async_client = AsyncGroq(api_key=os.getenv("GROQ_API_KEY"), base_url=GROQ_BASE_URL, max_retries=0, timeout=LLM_DEADLINE)
+DEFAULT_MODEL = "llama-3.3-70b-versatile"
+
+LLM_REQUEST_SECONDS = histogram(
+    "llm_request_seconds", "Latency of one chat completion attempt", ("model", "status")
+)
+LLM_TOKENS = counter("llm_tokens_total", "Tokens billed by the provider", ("model", "kind"))
+
+def _observe(model, started, completion=None, error=None):
+    if error is None:
+        status = "ok"
+    else:
+        status = str(getattr(error, "status_code", None) or type(error).__name__)
+    LLM_REQUEST_SECONDS.observe(time.perf_counter() - started, model=model, status=status)
+    usage = getattr(completion, "usage", None)
+    if usage is not None:
+        LLM_TOKENS.inc(usage.prompt_tokens or 0, model=model, kind="prompt")
+        LLM_TOKENS.inc(usage.completion_tokens or 0, model=model, kind="completion")
+
+def _complete(messages, temperature, model, max_tokens, timeout):
+    started = time.perf_counter()
+    try:
+        completion = client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            timeout=timeout
+        )
+    except BaseException as e:
+        _observe(model, started, error=e)
+        raise
+    _observe(model, started, completion)
+    return completion
+
+async def _acomplete(messages, temperature, model, max_tokens, timeout):
+    started = time.perf_counter()
+    try:
+        completion = await async_client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            timeout=timeout
+        )
+    except BaseException as e:
+        _observe(model, started, error=e)
+        raise
+    _observe(model, started, completion)
+    return completion
+
+LLM_GATEWAY = LLMGateway(_complete, _acomplete)
+register_collector(LLM_GATEWAY.collect)
+
+def ask_llama(messages, temperature=0.2, model=DEFAULT_MODEL):
+    return LLM_GATEWAY.call(messages, temperature=temperature, model=model, max_tokens=2000)
+
+async def aask_llama(messages, temperature=0.2, model=DEFAULT_MODEL):
+    return await LLM_GATEWAY.acall(messages, temperature=temperature, model=model, max_tokens=2000)
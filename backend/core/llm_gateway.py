@@ -0,0 +1,334 @@
+import os, time, random, asyncio, threading
+import groq
+from utils.logger import get_logger
+
+logger = get_logger("llm-gateway")
+
+# Provider quotas; 0 disables a bucket
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", 30))
+LLM_TOKENS_PER_MINUTE = float(os.getenv("LLM_TOKENS_PER_MINUTE", 12000))
+# Total budget of one call: queueing on the limiter, every attempt and backoff
+LLM_DEADLINE = float(os.getenv("LLM_DEADLINE", 30))
+LLM_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", 3))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", 0.5))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", 8))
+# Consecutive failed calls that open the breaker, and how long it stays open
+LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", 5))
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", 30))
+# Sync callers (webhook workers); the async path is capped by stage_limit("llm")
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", 8))
+
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+
+class LLMUnavailable(Exception):
+    """The call was not attempted or did not succeed in time; use the fallback."""
+
+class CircuitOpen(LLMUnavailable):
+    pass
+
+class DeadlineExceeded(LLMUnavailable):
+    pass
+
+class Throttled(LLMUnavailable):
+    """The local rate limiter could not admit the call before its deadline."""
+
+def estimate_tokens(messages):
+    # Roughly four characters per token plus per-message framing
+    return sum(len(m["content"]) // 4 + 4 for m in messages)
+
+class TokenBucket:
+    """Refills ``rate_per_minute`` units per minute, holding at most one minute's worth."""
+    def __init__(self, rate_per_minute):
+        self.capacity = float(rate_per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount, max_wait):
+        """Take ``amount`` and return the seconds to wait before using it.
+
+        The level may go negative, so waiters queue in reservation order.
+        Returns None, taking nothing, if the wait would exceed ``max_wait``.
+        """
+        if self.capacity <= 0:
+            return 0.0
+        # A request larger than the bucket must still be able to run
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._refill(time.monotonic())
+            wait = max(0.0, (amount - self.level) / self.rate)
+            if wait > max_wait:
+                return None
+            self.level -= amount
+            return wait
+
+    def refund(self, amount):
+        if self.capacity <= 0 or amount <= 0:
+            return
+        with self._lock:
+            self._refill(time.monotonic())
+            self.level = min(self.capacity, self.level + amount)
+
+def _status(error):
+    return getattr(error, "status_code", None)
+
+def _retryable(error):
+    if isinstance(error, (groq.APIConnectionError, asyncio.TimeoutError)):
+        return True
+    return _status(error) in RETRY_STATUSES
+
+def _describe(error):
+    return str(error) or type(error).__name__
+
+def _retry_after(error):
+    response = getattr(error, "response", None)
+    try:
+        return float(response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+class LLMGateway:
+    """Rate-limited, deadline-bound chat completions with a circuit breaker.
+
+    ``complete(messages, temperature, model, max_tokens, timeout)`` (and the
+    coroutine ``acomplete``) performs a single provider request without
+    retries. Each call reserves one request and its estimated tokens from
+    the buckets, retries 429/5xx and connection errors with jittered
+    exponential backoff (honouring Retry-After), and fails with
+    LLMUnavailable once its deadline passes. After ``breaker_threshold``
+    consecutive failed calls the breaker opens and calls fail immediately
+    with CircuitOpen; after ``breaker_cooldown`` one probe call is let
+    through and its outcome closes or re-opens the breaker.
+    """
+    def __init__(self, complete, acomplete=None,
+                 requests_per_minute=LLM_REQUESTS_PER_MINUTE,
+                 tokens_per_minute=LLM_TOKENS_PER_MINUTE,
+                 deadline=LLM_DEADLINE, max_attempts=LLM_MAX_ATTEMPTS,
+                 breaker_threshold=LLM_BREAKER_THRESHOLD,
+                 breaker_cooldown=LLM_BREAKER_COOLDOWN,
+                 concurrency=LLM_CONCURRENCY):
+        self.complete = complete
+        self.acomplete = acomplete
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.deadline = deadline
+        self.max_attempts = max_attempts
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self._slots = threading.BoundedSemaphore(concurrency)
+        self._lock = threading.Lock()
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._probing = False
+        self.counters = {
+            "calls": 0, "succeeded": 0, "failed": 0, "retries": 0,
+            "short_circuited": 0, "throttled": 0, "breaker_opened": 0
+        }
+
+    # Circuit breaker
+
+    def _admit(self):
+        with self._lock:
+            self.counters["calls"] += 1
+            if self.state == "open":
+                if time.monotonic() - self.opened_at < self.breaker_cooldown:
+                    self.counters["short_circuited"] += 1
+                    raise CircuitOpen("LLM provider unhealthy; circuit open")
+                self.state = "half_open"
+            if self.state == "half_open":
+                if self._probing:
+                    self.counters["short_circuited"] += 1
+                    raise CircuitOpen("LLM provider unhealthy; probe in flight")
+                self._probing = True
+
+    def _record(self, error=None):
+        with self._lock:
+            self._probing = False
+            if error is None:
+                if self.state != "closed":
+                    logger.info("LLM circuit closed")
+                self.state = "closed"
+                self.consecutive_failures = 0
+                self.counters["succeeded"] += 1
+                return
+            self.counters["failed"] += 1
+            if isinstance(error, Throttled):
+                self.counters["throttled"] += 1
+                return
+            if not isinstance(error, LLMUnavailable) and not _retryable(error):
+                # Bad request, auth, ...: our fault, not the provider's health
+                return
+            self.consecutive_failures += 1
+            if self.state == "half_open" or self.consecutive_failures >= self.breaker_threshold:
+                if self.state != "open":
+                    self.counters["breaker_opened"] += 1
+                    logger.warning(f"LLM circuit open for {self.breaker_cooldown}s after: {error}")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    # Rate limiting and retries
+
+    def _reserve(self, cost, deadline):
+        remaining = deadline - time.monotonic()
+        request_wait = self.requests.reserve(1, remaining)
+        if request_wait is None:
+            raise Throttled("LLM request rate limit reached")
+        token_wait = self.tokens.reserve(cost, remaining)
+        if token_wait is None:
+            self.requests.refund(1)
+            raise Throttled("LLM token rate limit reached")
+        return max(request_wait, token_wait)
+
+    def _backoff(self, attempt, error):
+        # Full jitter keeps retrying workers from hitting the provider in lockstep
+        delay = random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2 ** (attempt - 1)))
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            delay = retry_after + random.uniform(0, LLM_BACKOFF_BASE)
+        return delay
+
+    def _attempts(self, messages, max_tokens, deadline):
+        """Steps of one call: yields ``("wait", seconds)`` and ``("call", timeout)``.
+
+        Each "call" step is sent the completion or thrown the request's
+        error, so the same policy drives the sync and the async client.
+        Returns the completion.
+        """
+        cost = estimate_tokens(messages) + max_tokens
+        attempt = 0
+        while True:
+            attempt += 1
+            wait = self._reserve(cost, deadline)
+            if wait > 0:
+                yield "wait", wait
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise DeadlineExceeded(f"LLM deadline of {self.deadline}s exceeded")
+            try:
+                completion = yield "call", remaining
+            except Exception as e:
+                # Failed requests consume no tokens
+                self.tokens.refund(cost)
+                if not _retryable(e):
+                    raise
+                if attempt >= self.max_attempts:
+                    raise LLMUnavailable(f"LLM failed after {attempt} attempts: {_describe(e)}") from e
+                delay = self._backoff(attempt, e)
+                if time.monotonic() + delay >= deadline:
+                    raise DeadlineExceeded(f"LLM deadline of {self.deadline}s exceeded: {_describe(e)}") from e
+                logger.warning(f"LLM attempt {attempt} failed ({_describe(e)}); retrying in {delay:.2f}s")
+                with self._lock:
+                    self.counters["retries"] += 1
+                yield "wait", delay
+                continue
+            usage = getattr(completion, "usage", None)
+            if usage is not None and getattr(usage, "total_tokens", None):
+                self.tokens.refund(cost - usage.total_tokens)
+            return completion
+
+    def _drive(self, steps, **request):
+        try:
+            step, value = next(steps)
+            while True:
+                if step == "wait":
+                    time.sleep(value)
+                    step, value = steps.send(None)
+                    continue
+                try:
+                    completion = self.complete(timeout=value, **request)
+                except Exception as e:
+                    step, value = steps.throw(e)
+                else:
+                    step, value = steps.send(completion)
+        except StopIteration as done:
+            return done.value
+
+    async def _adrive(self, steps, **request):
+        try:
+            step, value = next(steps)
+            while True:
+                if step == "wait":
+                    await asyncio.sleep(value)
+                    step, value = steps.send(None)
+                    continue
+                try:
+                    completion = await asyncio.wait_for(self.acomplete(timeout=value, **request), value)
+                except Exception as e:
+                    step, value = steps.throw(e)
+                else:
+                    step, value = steps.send(completion)
+        except StopIteration as done:
+            return done.value
+
+    def call(self, messages, temperature=0.2, model=None, max_tokens=2000):
+        """Completion text; raises LLMUnavailable when the provider can't answer in time."""
+        deadline = time.monotonic() + self.deadline
+        self._admit()
+        try:
+            if not self._slots.acquire(timeout=self.deadline):
+                raise Throttled("No LLM slot free before the deadline")
+            try:
+                completion = self._drive(
+                    self._attempts(messages, max_tokens, deadline),
+                    messages=messages, temperature=temperature, model=model, max_tokens=max_tokens
+                )
+            finally:
+                self._slots.release()
+        except BaseException as e:
+            self._record(e)
+            raise
+        self._record()
+        return completion.choices[0].message.content
+
+    async def acall(self, messages, temperature=0.2, model=None, max_tokens=2000):
+        deadline = time.monotonic() + self.deadline
+        self._admit()
+        try:
+            completion = await self._adrive(
+                self._attempts(messages, max_tokens, deadline),
+                messages=messages, temperature=temperature, model=model, max_tokens=max_tokens
+            )
+        except BaseException as e:
+            self._record(e)
+            raise
+        self._record()
+        return completion.choices[0].message.content
+
+    def reset(self):
+        with self._lock:
+            self.state = "closed"
+            self.consecutive_failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def collect(self):
+        stats = self.stats()
+        yield "llm_gateway_calls_total", "counter", "LLM gateway calls by outcome", [
+            ({"outcome": outcome}, stats[outcome]) for outcome in ("succeeded", "failed", "short_circuited")
+        ]
+        yield "llm_gateway_throttled_total", "counter", "Calls the local rate limiter could not admit in time", [({}, stats["throttled"])]
+        yield "llm_gateway_retries_total", "counter", "Retried provider attempts", [({}, stats["retries"])]
+        yield "llm_gateway_breaker_opened_total", "counter", "Times the circuit breaker opened", [({}, stats["breaker_opened"])]
+        yield "llm_gateway_circuit_state", "gauge", "1 for the breaker's current state", [
+            ({"state": state}, int(stats["state"] == state)) for state in ("closed", "open", "half_open")
+        ]
+        yield "llm_gateway_bucket_available", "gauge", "Units left in the rate limit buckets", [
+            ({"bucket": "requests"}, stats["requests_available"]),
+            ({"bucket": "tokens"}, stats["tokens_available"])
+        ]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "requests_available": round(self.requests.level, 2),
+                "tokens_available": round(self.tokens.level, 2),
+                **self.counters
+            }
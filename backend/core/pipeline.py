@@ -0,0 +1,153 @@
+import time, asyncio, dataclasses
+from contextlib import AsyncExitStack, nullcontext
+from dataclasses import dataclass
+from typing import Callable, Tuple, Optional
+from core.stage_limits import stage_limit, settle, drain, ANALYSIS_EXECUTOR
+from core.metrics import counter, histogram
+
+STAGE_SECONDS = histogram("pipeline_stage_seconds", "Wall time of one pipeline stage", ("pipeline", "stage"))
+STAGE_ERRORS = counter("pipeline_stage_errors_total", "Pipeline stages that raised", ("pipeline", "stage", "error"))
+RUN_SECONDS = histogram("pipeline_run_seconds", "End-to-end wall time of a pipeline run", ("pipeline", "outcome"))
+
+class PipelineError(Exception):
+    """The stage graph is malformed (unknown field, missing producer, cycle)."""
+
+@dataclass(frozen=True)
+class Stage:
+    """One node of a stage graph.
+
+    ``fn(ctx)`` reads the context fields named in ``requires`` and sets
+    those in ``provides``; a stage starts as soon as every stage providing
+    its requirements has finished. Coroutine functions are awaited on the
+    loop; plain functions run ``inline`` (cheap), on a ``thread`` (blocking
+    I/O) or on the pipeline's analysis executor (``cpu``). ``limit`` names a
+    stage_limits semaphore held while the stage runs.
+    """
+    name: str
+    fn: Callable
+    requires: Tuple[str, ...] = ()
+    provides: Tuple[str, ...] = ()
+    run: str = "inline"
+    limit: Optional[str] = None
+
+class Pipeline:
+    """Runs a declarative graph of stages concurrently over a dataclass context.
+
+    Fields no stage provides must be set on the context before ``run``. The
+    context's ``resources`` AsyncExitStack stays open until every stage,
+    including the executor thread of a cancelled one, has finished, so a
+    stage can hand a worktree or connection to later ones. The first
+    failing stage cancels the rest and its error propagates. ``cpu`` stages
+    run on ``executor``, ANALYSIS_EXECUTOR unless the pipeline brings its own.
+    """
+    def __init__(self, stages, name="pipeline", executor=None):
+        self.name = name
+        self.executor = executor or ANALYSIS_EXECUTOR
+        self.stages = list(stages)
+        self.producers = {}
+        for stage in self.stages:
+            if stage.run not in ("inline", "thread", "cpu"):
+                raise PipelineError(f"Stage {stage.name}: unknown run mode {stage.run!r}")
+            for name in stage.provides:
+                if name in self.producers:
+                    raise PipelineError(f"{name} provided by both {self.producers[name].name} and {stage.name}")
+                self.producers[name] = stage
+        self.dependencies = {
+            stage.name: sorted({self.producers[n].name for n in stage.requires if n in self.producers})
+            for stage in self.stages
+        }
+        self._check_acyclic()
+
+    def _check_acyclic(self):
+        state = {}
+        def visit(name, path):
+            if state.get(name) == "done":
+                return
+            if state.get(name) == "active":
+                raise PipelineError("Stage cycle: " + " -> ".join(path + [name]))
+            state[name] = "active"
+            for dep in self.dependencies[name]:
+                visit(dep, path + [name])
+            state[name] = "done"
+        for stage in self.stages:
+            visit(stage.name, [])
+
+    def _validate(self, ctx):
+        fields = {f.name for f in dataclasses.fields(ctx)}
+        for stage in self.stages:
+            for name in stage.requires + stage.provides:
+                if name not in fields:
+                    raise PipelineError(f"Stage {stage.name}: {type(ctx).__name__} has no field {name}")
+            for name in stage.requires:
+                if name not in self.producers and getattr(ctx, name) is None:
+                    raise PipelineError(f"Stage {stage.name} requires {name}, which nothing provides")
+
+    async def _call(self, stage, ctx, limits, threads):
+        limit = stage_limit(stage.limit) if limits and stage.limit else nullcontext()
+        async with limit:
+            if asyncio.iscoroutinefunction(stage.fn):
+                return await stage.fn(ctx)
+            if stage.run == "inline":
+                return stage.fn(ctx)
+            executor = self.executor if stage.run == "cpu" else None
+            future = asyncio.get_running_loop().run_in_executor(executor, stage.fn, ctx)
+            threads.append(future)
+            # A cancelled stage keeps its slot until the thread returns
+            return await settle(future)
+
+    def _observe(self, ctx, stage, started):
+        elapsed = time.perf_counter() - started
+        ctx.timings[stage.name] = round(elapsed, 4)
+        STAGE_SECONDS.observe(elapsed, pipeline=self.name, stage=stage.name)
+
+    async def run(self, ctx, check=None, limits=True):
+        """Run every stage; ``check()`` is called before each one starts.
+
+        ``limits=False`` skips the stage semaphores, which belong to the
+        server's event loop, when running on a private loop.
+        """
+        self._validate(ctx)
+        tasks = {}
+        threads = []
+
+        async def run_stage(stage):
+            deps = [tasks[name] for name in self.dependencies[stage.name]]
+            if deps:
+                await asyncio.gather(*deps)
+            if check is not None:
+                check()
+            started = time.perf_counter()
+            try:
+                await self._call(stage, ctx, limits, threads)
+            except asyncio.CancelledError:
+                # Stopped because a sibling failed; its duration means nothing
+                raise
+            except BaseException as e:
+                STAGE_ERRORS.inc(pipeline=self.name, stage=stage.name, error=type(e).__name__)
+                self._observe(ctx, stage, started)
+                raise
+            self._observe(ctx, stage, started)
+
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            async with AsyncExitStack() as resources:
+                ctx.resources = resources
+                for stage in self.stages:
+                    tasks[stage.name] = asyncio.ensure_future(run_stage(stage))
+                try:
+                    await asyncio.gather(*tasks.values())
+                except BaseException:
+                    for task in tasks.values():
+                        task.cancel()
+                    await asyncio.gather(*tasks.values(), return_exceptions=True)
+                    raise
+                finally:
+                    # Cancelling a task doesn't stop its executor thread, which
+                    # may still be reading the worktree the stack is about to remove
+                    await drain(threads)
+                    ctx.resources = None
+            outcome = "ok"
+        finally:
+            RUN_SECONDS.observe(time.perf_counter() - started, pipeline=self.name, outcome=outcome)
+        return ctx
@@ -0,0 +1,116 @@
+import os, json, time, asyncio, sqlite3, hashlib, tempfile, threading
+from core.bounded_cache import BoundedCache
+from utils.logger import get_logger
+
+logger = get_logger("review-cache")
+
+# Empty path keeps the cache in memory only
+LLM_CACHE_PATH = os.getenv(
+    "LLM_CACHE_PATH",
+    os.path.join(tempfile.gettempdir(), "pr-risk-llm-cache.sqlite3")
+)
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", 7 * 24 * 3600))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 10000))
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", 1024))
+
+def normalize_messages(messages):
+    # Indentation and line wrapping in the prompt templates carry no meaning
+    return [[m["role"], " ".join(m["content"].split())] for m in messages]
+
+def review_cache_key(model, messages, temperature):
+    payload = json.dumps([model, normalize_messages(messages), round(float(temperature), 4)])
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+class ReviewCache:
+    """Validated LLM reviews by prompt hash: memory LRU over a sqlite table.
+
+    Entries expire after ``ttl`` seconds; past ``max_entries`` rows the
+    least recently used ones are deleted. Disk errors degrade to a
+    memory-only cache rather than failing the review. Async callers use
+    ``aget``/``aset`` so sqlite never blocks the event loop.
+    """
+    def __init__(self, path=LLM_CACHE_PATH, ttl=LLM_CACHE_TTL, max_entries=LLM_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.memory = BoundedCache("llm_review", max_entries=LLM_CACHE_MEMORY_ENTRIES, ttl=ttl)
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            try:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+                self._db.execute("PRAGMA journal_mode=WAL")
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS reviews ("
+                    "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                    "created_at REAL NOT NULL, used_at REAL NOT NULL)"
+                )
+                self._db.execute("CREATE INDEX IF NOT EXISTS reviews_used_at ON reviews (used_at)")
+            except sqlite3.Error as e:
+                logger.warning(f"LLM cache at {path} unavailable, memory only: {e}")
+                self._db = None
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is not None or self._db is None:
+            return value
+        now = time.time()
+        try:
+            with self._lock:
+                row = self._db.execute(
+                    "SELECT value, created_at FROM reviews WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                if row[1] + self.ttl <= now:
+                    self._db.execute("DELETE FROM reviews WHERE key = ?", (key,))
+                    return None
+                self._db.execute("UPDATE reviews SET used_at = ? WHERE key = ?", (now, key))
+        except sqlite3.Error as e:
+            logger.warning(f"LLM cache read failed: {e}")
+            return None
+        value = json.loads(row[0])
+        self.memory.set(key, value)
+        return value
+
+    def set(self, key, value):
+        self.memory.set(key, value)
+        if self._db is None:
+            return
+        now = time.time()
+        try:
+            with self._lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO reviews (key, value, created_at, used_at) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value), now, now)
+                )
+                self._db.execute("DELETE FROM reviews WHERE created_at <= ?", (now - self.ttl,))
+                self._db.execute(
+                    "DELETE FROM reviews WHERE key IN ("
+                    "SELECT key FROM reviews ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"LLM cache write failed: {e}")
+
+    async def aget(self, key):
+        # Memory hits stay on the loop; sqlite and its lock go to a thread
+        value = self.memory.get(key)
+        if value is not None or self._db is None:
+            return value
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key, value):
+        if self._db is None:
+            self.memory.set(key, value)
+            return
+        await asyncio.to_thread(self.set, key, value)
+
+    def clear(self):
+        self.memory.clear()
+        if self._db is not None:
+            with self._lock:
+                self._db.execute("DELETE FROM reviews")
+
+REVIEW_CACHE = ReviewCache()
@@ -0,0 +1,92 @@
+import os, asyncio
+from concurrent.futures import ThreadPoolExecutor
+from core.metrics import register_collector
+
+# Max concurrent requests per pipeline stage on the async path
+STAGE_CONCURRENCY = {
+    "checkout": int(os.getenv("CHECKOUT_CONCURRENCY", 4)),
+    "analysis": int(os.getenv("ANALYSIS_CONCURRENCY", 2)),
+    "llm": int(os.getenv("LLM_CONCURRENCY", 8))
+}
+# CPU-bound stages run here rather than on the server's shared threadpool,
+# so health checks and sync routes never wait behind graph builds
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", STAGE_CONCURRENCY["analysis"]))
+ANALYSIS_EXECUTOR = ThreadPoolExecutor(max_workers=ANALYSIS_WORKERS, thread_name_prefix="analysis")
+
+class StageLimit:
+    """Semaphore for one stage that counts its holders and waiters."""
+    def __init__(self, limit):
+        self.limit = limit
+        self.in_use = 0
+        self.waiting = 0
+        self._semaphore = asyncio.Semaphore(limit)
+
+    async def __aenter__(self):
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_use += 1
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.in_use -= 1
+        self._semaphore.release()
+
+STAGE_LIMITS = {name: StageLimit(limit) for name, limit in STAGE_CONCURRENCY.items()}
+
+def stage_limit(name):
+    return STAGE_LIMITS[name]
+
+async def drain(futures):
+    """Wait until every executor future is done, even through cancellation.
+
+    Executor threads can't be cancelled, so anything they use (a worktree,
+    a stage slot) must outlive them; a cancellation received meanwhile is
+    re-raised once they have all returned.
+    """
+    cancelled = False
+    while True:
+        running = [f for f in futures if not f.done()]
+        if not running:
+            break
+        try:
+            await asyncio.wait(running)
+        except asyncio.CancelledError:
+            cancelled = True
+    if cancelled:
+        raise asyncio.CancelledError()
+
+async def settle(future):
+    # Await an executor future; if cancelled, only return once its thread has
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        await drain([future])
+        raise
+
+def stage_stats():
+    return {
+        name: {
+            "limit": limit.limit,
+            "in_use": limit.in_use,
+            "available": limit.limit - limit.in_use,
+            "waiting": limit.waiting
+        }
+        for name, limit in STAGE_LIMITS.items()
+    }
+
+def _collect_stage_limits():
+    stats = stage_stats()
+    yield "stage_limit_available", "gauge", "Free slots of each stage limit", [
+        ({"stage": name}, s["available"]) for name, s in sorted(stats.items())
+    ]
+    yield "stage_limit_in_use", "gauge", "Requests holding a stage slot", [
+        ({"stage": name}, s["in_use"]) for name, s in sorted(stats.items())
+    ]
+    yield "stage_limit_waiting", "gauge", "Requests waiting for a stage slot", [
+        ({"stage": name}, s["waiting"]) for name, s in sorted(stats.items())
+    ]
+
+register_collector(_collect_stage_limits)
@@ -1,16 +1,4 @@
-import ast, os
+from intelligence.file_analysis import analyze_file
 def extract_functions(file_path):
-    try:
-        with open(file_path, "r") as f:
-            tree = ast.parse(f.read())
-    except:
-        return []
-    functions = []
-    for node in ast.walk(tree):
-        if isinstance(node, ast.FunctionDef):
-            functions.append({
-                "name": node.name,
-                "args": [arg.arg for arg in node.args.args],
-                "lineno": node.lineno
-            })
-    return functions
\ No newline at end of file
+    # Shares the cached single-parse record with the other engines
+    return list(analyze_file(file_path).functions)
\ No newline at end of file
@@ -1,6 +1,5 @@
 import os
-from intelligence.semantic_analyzer import detect_sensitive_keywords
-from intelligence.ast_parser import extract_functions
+from intelligence.file_analysis import analyze_file
 def contextual_risk_score(repo_path, changed_files):
     risk_score = 0
     reasons = []
@@ -8,10 +7,10 @@ def contextual_risk_score(repo_path, changed_files):
         full_path = os.path.join(repo_path, file)
         if not os.path.exists(full_path):
             continue
-        with open(full_path, "r", errors="ignore") as f:
-            content = f.read()
-        keywords = detect_sensitive_keywords(content)
-        functions = extract_functions(full_path)
+        # One read and parse per blob, shared with the dependency graph build
+        record = analyze_file(full_path)
+        keywords = list(record.keywords)
+        functions = record.functions
         if keywords:
             risk_score += len(keywords) * 5
             reasons.append(f"{file} contains sensitive keywords: {keywords}")
@@ -0,0 +1,141 @@
+import ast, os, sys, hashlib
+from dataclasses import dataclass
+from core.bounded_cache import BoundedCache
+from core.metrics import counter
+from agents.js_import_scanner import JS_EXTENSIONS, scan_js_imports
+from intelligence.semantic_analyzer import detect_sensitive_keywords, scan_sensitive_keywords
+
+FILE_ANALYSIS_CACHE = BoundedCache(
+    "file_analysis",
+    max_entries=int(os.getenv("FILE_ANALYSIS_CACHE_MAX_ENTRIES", 50000)),
+    max_bytes=int(os.getenv("FILE_ANALYSIS_CACHE_MAX_BYTES", 128 * 1024 * 1024))
+)
+# Cache misses only; parses in IMPORT_WORKERS subprocesses are not counted
+FILES_PARSED = counter("files_parsed_total", "Source files read and analyzed", ("kind",))
+FILE_BYTES_PARSED = counter("file_bytes_parsed_total", "Bytes of source analyzed", ("kind",))
+FILE_PARSE_ERRORS = counter("file_parse_errors_total", "Source files that failed to parse", ("kind",))
+
+@dataclass
+class FileAnalysis:
+    """Everything the engines need from one source file.
+
+    Produced by a single read and, for Python, a single ``ast.parse``; the
+    dependency graph uses ``imports`` and the contextual risk engine uses
+    ``functions`` and ``keywords``. ``keyword_hits`` maps each matched
+    pattern to its occurrence count and line numbers.
+    """
+    blob: str
+    imports: tuple = ()
+    functions: tuple = ()
+    classes: tuple = ()
+    keywords: tuple = ()
+    keyword_hits: dict = None
+    parsed: bool = False
+    size: int = 0
+
+    def nbytes(self):
+        size = sys.getsizeof(self) + sum(sys.getsizeof(i) for i in self.imports)
+        size += 200 * (len(self.functions) + len(self.classes))
+        return size + 100 * len(self.keyword_hits or ())
+
+def git_blob_sha(data: bytes) -> str:
+    # Same id git assigns the blob, so it lines up with ls-files hashes
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+def _arg_names(args: ast.arguments):
+    names = [a.arg for a in args.posonlyargs + args.args]
+    if args.vararg:
+        names.append("*" + args.vararg.arg)
+    elif args.kwonlyargs:
+        names.append("*")
+    names.extend(a.arg for a in args.kwonlyargs)
+    if args.kwarg:
+        names.append("**" + args.kwarg.arg)
+    return names
+
+def _analyze_python(source):
+    imports = []
+    functions = []
+    classes = []
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        # Fallback regex-based extraction
+        for line in source.splitlines():
+            line = line.strip()
+            if line.startswith("import "):
+                module = line.replace("import ", "").split(" as ")[0]
+                imports.append(module)
+            elif line.startswith("from "):
+                module = line.replace("from ", "").split(" import ")[0]
+                imports.append(module)
+        return imports, functions, classes, False
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                imports.append(alias.name)
+        elif isinstance(node, ast.ImportFrom):
+            # Relative imports keep their leading dots so the
+            # module index can resolve them against the importer
+            prefix = "." * (node.level or 0)
+            if node.module:
+                imports.append(prefix + node.module)
+            elif prefix:
+                for alias in node.names:
+                    imports.append(prefix + alias.name)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            args = _arg_names(node.args)
+            prefix = "async def " if isinstance(node, ast.AsyncFunctionDef) else "def "
+            functions.append({
+                "name": node.name,
+                "args": [a.arg for a in node.args.args],
+                "lineno": node.lineno,
+                "signature": f"{prefix}{node.name}({', '.join(args)})"
+            })
+        elif isinstance(node, ast.ClassDef):
+            classes.append({
+                "name": node.name,
+                "bases": [ast.unparse(b) for b in node.bases],
+                "lineno": node.lineno
+            })
+    return imports, functions, classes, True
+
+def analyze_file(file_path):
+    """Cached FileAnalysis for ``file_path``, keyed by its content hash."""
+    try:
+        with open(file_path, "rb") as f:
+            data = f.read()
+    except OSError as e:
+        print(f"[IMPORT PARSE ERROR] {file_path} -> {e}")
+        return FileAnalysis(blob="")
+    kind = "js" if file_path.endswith(JS_EXTENSIONS) else "py" if file_path.endswith(".py") else "other"
+    blob = git_blob_sha(data)
+    cached = FILE_ANALYSIS_CACHE.get((blob, kind))
+    if cached is not None:
+        return cached
+    source = data.decode("utf-8", errors="ignore")
+    imports, functions, classes, parsed = [], [], [], False
+    try:
+        if kind == "py":
+            imports, functions, classes, parsed = _analyze_python(source)
+        elif kind == "js":
+            imports = scan_js_imports(source)
+    except Exception as e:
+        FILE_PARSE_ERRORS.inc(kind=kind)
+        print(f"[IMPORT PARSE ERROR] {file_path} -> {e}")
+    FILES_PARSED.inc(kind=kind)
+    FILE_BYTES_PARSED.inc(len(data), kind=kind)
+    # Scanned on the raw bytes; every graph file passes through here
+    keyword_hits = scan_sensitive_keywords(data)
+    record = FileAnalysis(
+        blob=blob,
+        imports=tuple(imports),
+        functions=tuple(functions),
+        classes=tuple(classes),
+        keywords=tuple(detect_sensitive_keywords(data, keyword_hits)),
+        keyword_hits=keyword_hits,
+        parsed=parsed,
+        size=len(data)
+    )
+    FILE_ANALYSIS_CACHE.set((blob, kind), record)
+    return record
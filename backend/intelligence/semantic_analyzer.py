@@ -1,9 +1,124 @@
+import os, re, json
+
 CRITICAL_PATTERNS = [
     "auth", "token", "jwt", "password", "payment", "stripe", "database", "execute", "eval"
 ]
-def detect_sensitive_keywords(file_content):
-    findings = []
-    for keyword in CRITICAL_PATTERNS:
-        if keyword in file_content.lower():
-            findings.append(keyword)
-    return findings
\ No newline at end of file
+# Extra indicators (secrets, auth, SQL, crypto, ...) are loaded from this file:
+# a JSON list, a JSON object of {category: [patterns]}, or one pattern per line
+SENSITIVE_PATTERNS_FILE = os.getenv("SENSITIVE_PATTERNS_FILE")
+# Line numbers kept per pattern; counts are always exact
+MAX_KEYWORD_LINES = int(os.getenv("MAX_KEYWORD_LINES", 20))
+
+def load_patterns(path=None):
+    patterns = list(CRITICAL_PATTERNS)
+    path = path or SENSITIVE_PATTERNS_FILE
+    if not path:
+        return patterns
+    try:
+        with open(path) as f:
+            text = f.read()
+    except OSError as e:
+        print(f"[PATTERN LOAD ERROR] {path} -> {e}")
+        return patterns
+    try:
+        data = json.loads(text)
+    except ValueError:
+        data = [line.strip() for line in text.splitlines() if line.strip() and not line.startswith("#")]
+    if isinstance(data, dict):
+        data = [p for group in data.values() for p in group]
+    patterns.extend(str(p) for p in data)
+    return patterns
+
+def _trie_regex(trie, top=False):
+    # Alternatives share prefixes, so each position is tested once per trie
+    # level rather than once per pattern. Top-level branches start with a
+    # plain byte in both cases so the regex engine can skip non-candidate
+    # positions in C; deeper letters use [xX] classes.
+    branches = []
+    for byte in sorted(k for k in trie if k is not None):
+        char = bytes([byte])
+        rest = _trie_regex(trie[byte])
+        if not char.isalpha():
+            branches.append(re.escape(char) + rest)
+        elif top:
+            branches.append(char + rest)
+            branches.append(char.upper() + rest)
+        else:
+            branches.append(b"[" + char + char.upper() + b"]" + rest)
+    if not branches:
+        return b""
+    if len(branches) == 1 and None not in trie:
+        return branches[0]
+    # Greedy optional tail: the longest pattern at a position wins
+    return b"(?:" + b"|".join(branches) + b")" + (b"?" if None in trie else b"")
+
+class KeywordMatcher:
+    """Case-insensitive search for many literal patterns in a single pass.
+
+    Patterns are compiled into one prefix-trie regex over bytes, so the scan
+    cost barely grows with the number of patterns and no lowercased copy of
+    the input is made. Every occurrence is reported, including overlapping
+    ones (``auth`` inside ``oauth``), with the same semantics as a
+    substring test. Case folding covers ASCII letters only.
+    """
+    def __init__(self, patterns):
+        self.patterns = list(dict.fromkeys(p.lower() for p in patterns if p))
+        encoded = {p.encode("utf-8"): p for p in self.patterns}
+        trie = {}
+        for key in encoded:
+            node = trie
+            for byte in key:
+                node = node.setdefault(byte, {})
+            node[None] = True
+        self._regex = re.compile(_trie_regex(trie, top=True)) if encoded else None
+        # The longest match at a position implies every shorter pattern that
+        # is a prefix of it
+        self._implied = {
+            key: tuple(encoded[key[:i]] for i in range(1, len(key) + 1) if key[:i] in encoded)
+            for key in encoded
+        }
+
+    def scan(self, data):
+        """``{pattern: {"count": n, "lines": [...]}}`` for patterns found in ``data``.
+
+        ``lines`` holds 1-based line numbers of the first MAX_KEYWORD_LINES
+        occurrences.
+        """
+        if isinstance(data, str):
+            data = data.encode("utf-8", errors="ignore")
+        hits = {}
+        if self._regex is None:
+            return hits
+        search = self._regex.search
+        implied = self._implied
+        line = 1
+        line_start = 0
+        pos = 0
+        while True:
+            match = search(data, pos)
+            if match is None:
+                break
+            start = match.start()
+            line += data.count(b"\n", line_start, start)
+            line_start = start
+            for pattern in implied[match.group().lower()]:
+                hit = hits.get(pattern)
+                if hit is None:
+                    hit = hits[pattern] = {"count": 0, "lines": []}
+                hit["count"] += 1
+                if len(hit["lines"]) < MAX_KEYWORD_LINES and (not hit["lines"] or hit["lines"][-1] != line):
+                    hit["lines"].append(line)
+            # Restart one byte later so overlapping occurrences are found
+            pos = start + 1
+        return hits
+
+SENSITIVE_MATCHER = KeywordMatcher(load_patterns())
+
+def scan_sensitive_keywords(file_content):
+    return SENSITIVE_MATCHER.scan(file_content)
+
+def detect_sensitive_keywords(file_content, hits=None):
+    """Distinct sensitive patterns present in ``file_content`` (str or bytes)."""
+    if hits is None:
+        hits = SENSITIVE_MATCHER.scan(file_content)
+    return [pattern for pattern in SENSITIVE_MATCHER.patterns if pattern in hits]
@@ -1,21 +1,27 @@
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
 from pydantic import BaseModel, HttpUrl
 from typing import List
 from routes.webhook import router as webhook_router
-import subprocess, os, uuid, shutil, hmac, hashlib, json, requests
-from agents.enterprise_decision_engine import build_enterprise_decision
-from agents.hybrid_governance_engine import compute_hybrid_merge_decision
-from agents.pr_risk_engine import (
-    calculate_pr_risk
-)
-from agents.llm_review_engine import generate_llm_review
+import subprocess, hmac, hashlib, json, requests
+from agents.pr_pipeline import PRContext, analysis_stages
+from core.bounded_cache import CACHES
+from core.stage_limits import stage_stats
+from core.pipeline import Pipeline
+from core.llm import LLM_GATEWAY
+from core.metrics import render_metrics, CONTENT_TYPE
+from agents.impact_engine import start_import_pool
 app = FastAPI(
     title="Autonomous PR Risk Engine",
     version="1.0.0",
     description="Stateless architectural impact analysis for pull requests."
 )
 app.include_router(webhook_router)
+API_PIPELINE = Pipeline(analysis_stages(async_llm=True), name="api")
+@app.on_event("startup")
+def startup():
+    start_import_pool()
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # Restrict to frontend domain in prod
@@ -33,49 +39,34 @@ def health():
         "service": "pr-risk-engine",
         "mode": "stateless"
     }
+@app.get("/cache-stats")
+def cache_stats():
+    return {name: cache.stats() for name, cache in CACHES.items()}
+@app.get("/stage-stats")
+def stage_stats_route():
+    return stage_stats()
+@app.get("/llm-stats")
+def llm_stats():
+    return LLM_GATEWAY.stats()
+@app.get("/metrics")
+def metrics():
+    # Prometheus text exposition of every registered metric and collector
+    return Response(render_metrics(), media_type=CONTENT_TYPE)
 @app.post("/pr-risk-analysis")
-def pr_risk_analysis(request: PRRiskRequest):
-    temp_dir = f"/tmp/{uuid.uuid4()}"
+async def pr_risk_analysis(request: PRRiskRequest):
     try:
-        clone_command = ["git", "clone", "--depth", "1", str(request.repo_url), temp_dir]
-        result = subprocess.run(
-            clone_command,
-            capture_output=True,
-            text=True,
-            timeout=30
-        )
-        if result.returncode != 0:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Git clone failed: {result.stderr}"
-            )
-        pr_data = calculate_pr_risk(
-            repo_path=temp_dir,
-            changed_files=request.changed_files
-        )
-        # Enterprise layer first
-        enterprise_layer = build_enterprise_decision(pr_data)
-        pr_data.update(enterprise_layer)
-        # Hybrid governance next
-        hybrid_layer = compute_hybrid_merge_decision(pr_data)
-        pr_data.update(hybrid_layer)
-        # LLM interpretation layer last
-        ai_summary = generate_llm_review(pr_data)
-        pr_data["ai_analysis"] = ai_summary
-        # Deterministic override protection
-        if pr_data["hybrid_governance"]["governance_level"] == "CRITICAL":
-            pr_data["ai_analysis"]["merge_readiness"] = "LOW"
-        return pr_data
+        # Independent stages overlap; each holds only its own stage limit,
+        # so a slow fetch never occupies an analysis or LLM slot
+        ctx = PRContext(repo_url=str(request.repo_url), changed_files=request.changed_files)
+        await API_PIPELINE.run(ctx)
+        return ctx.result
     except subprocess.TimeoutExpired:
         raise HTTPException(
             status_code=504,
-            detail="Repository clone timed out."
+            detail="Repository fetch timed out."
         )
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=str(e)
-        )
-    finally:
-        if os.path.exists(temp_dir):
-            shutil.rmtree(temp_dir)
\ No newline at end of file
+        )
\ No newline at end of file
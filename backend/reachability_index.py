@@ -0,0 +1,102 @@
+import os, sys
+from compact_graph import CompactGraph
+
+REACHABILITY_INDEX = os.getenv("REACHABILITY_INDEX", "0") == "1"
+REACHABILITY_MAX_BYTES = int(os.getenv("REACHABILITY_MAX_BYTES", 64 * 1024 * 1024))
+
+class ReachabilityIndex:
+    """Transitive dependents of every file, precomputed once per snapshot.
+
+    Built on the reverse graph: strongly connected components are collapsed
+    and each component gets a bitset (a Python int over node ids) of every
+    node reachable from it, filled in reverse topological order of the
+    condensation. Dependent counts are then a popcount. BFS depth has no
+    closed form over the closure, so it is computed on first request and
+    memoized per file.
+    """
+    def __init__(self, reverse_graph: CompactGraph, component, closure):
+        self.graph = reverse_graph
+        self.component = component
+        self.closure = closure
+        sizes = {}
+        for c in component:
+            sizes[c] = sizes.get(c, 0) + 1
+        # A file on an import cycle (or importing itself) is its own dependent
+        self.transitive = [
+            closure[c].bit_count() - (0 if sizes[c] > 1 or i in reverse_graph.successor_ids(i) else 1)
+            for i, c in enumerate(component)
+        ]
+        self.depths = {}
+
+    @classmethod
+    def estimate_bytes(cls, n_components, n_nodes):
+        return n_components * (n_nodes // 8 + sys.getsizeof(0))
+
+    @classmethod
+    def build(cls, reverse_graph: CompactGraph, max_bytes=None):
+        """Index for ``reverse_graph``, or None when it exceeds the budget."""
+        max_bytes = REACHABILITY_MAX_BYTES if max_bytes is None else max_bytes
+        component, count = reverse_graph.strongly_connected_components()
+        if cls.estimate_bytes(count, len(reverse_graph)) > max_bytes:
+            print("REACHABILITY INDEX SKIPPED: over budget for", count, "components")
+            return None
+        members = [0] * count
+        for i, c in enumerate(component):
+            members[c] |= 1 << i
+        offsets, targets = reverse_graph.out_offsets, reverse_graph.out_targets
+        nodes_of = [[] for _ in range(count)]
+        for i, c in enumerate(component):
+            nodes_of[c].append(i)
+        closure = [0] * count
+        # Tarjan numbering: successor components always have lower numbers
+        for c in range(count):
+            reach = members[c]
+            for i in nodes_of[c]:
+                for j in targets[offsets[i]:offsets[i + 1]]:
+                    d = component[j]
+                    if d != c:
+                        reach |= closure[d]
+            closure[c] = reach
+        return cls(reverse_graph, component, closure)
+
+    def direct_dependents(self, node):
+        return self.graph.out_degree(node)
+
+    def transitive_dependents(self, node):
+        return self.transitive[self.graph.ids[node]]
+
+    def depth(self, node):
+        i = self.graph.ids[node]
+        if i not in self.depths:
+            depth = self.graph.bfs([i])
+            back = self.graph.return_depth(i, depth)
+            self.depths[i] = max(max(depth.values()), back or 0)
+        return self.depths[i]
+
+    def dependents_of(self, roots):
+        """Union of dependents of ``roots`` as ``{node: [roots reaching it]}``."""
+        ids = self.graph.ids
+        nodes = self.graph.nodes
+        reach = {}
+        for root in roots:
+            i = ids[root]
+            reach[root] = self.closure[self.component[i]] & ~(1 << i)
+        union = 0
+        for bits in reach.values():
+            union |= bits
+        result = {}
+        bits = union
+        while bits:
+            low = bits & -bits
+            u = low.bit_length() - 1
+            result[nodes[u]] = [root for root, r in reach.items() if r & low]
+            bits ^= low
+        return result
+
+    def nbytes(self):
+        return (
+            sum(sys.getsizeof(bits) for bits in self.closure)
+            + sys.getsizeof(self.closure)
+            + sys.getsizeof(self.component)
+            + sys.getsizeof(self.transitive)
+        )
@@ -1,76 +1,67 @@
-from fastapi import APIRouter, Request, Header, HTTPException, BackgroundTasks
-import json, tempfile, subprocess, shutil
+from fastapi import APIRouter, Request, Header, HTTPException
+import os, json, asyncio
+from concurrent.futures import ThreadPoolExecutor
 from services.github_auth import (
     generate_installation_token,
+    with_installation_token,
     get_pr_files,
     post_pr_comment
 )
 from utils.security import verify_signature
 from utils.logger import get_logger
-from agents.pr_risk_engine import calculate_pr_risk
-from agents.llm_review_engine import generate_llm_review
-from agents.enterprise_decision_engine import build_enterprise_decision
-from agents.hybrid_governance_engine import compute_hybrid_merge_decision
+from services.job_scheduler import JobScheduler, JobCancelled
+from agents.pr_pipeline import PRContext, analysis_stages
+from core.pipeline import Pipeline, Stage
 import textwrap
 logger = get_logger("github-webhook")
 router = APIRouter()
 
-def process_pr_event(payload: dict):
-    try:
-        installation_id = payload["installation"]["id"]
-        repo_full_name = payload["repository"]["full_name"]
-        repo_clone_url = payload["repository"]["clone_url"]
-        pr_number = payload["pull_request"]["number"]
-        changed_files_count = payload["pull_request"].get("changed_files", 0)
-        logger.info(f"Processing PR #{pr_number} for {repo_full_name}")
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", 2))
+WEBHOOK_QUEUE_MAX = int(os.getenv("WEBHOOK_QUEUE_MAX", 100))
+# Webhook jobs hold no "analysis" slot, so they get their own CPU threads
+# rather than starving /pr-risk-analysis of the shared ANALYSIS_EXECUTOR
+WEBHOOK_ANALYSIS_WORKERS = int(os.getenv("WEBHOOK_ANALYSIS_WORKERS", WEBHOOK_WORKERS))
+WEBHOOK_EXECUTOR = ThreadPoolExecutor(max_workers=WEBHOOK_ANALYSIS_WORKERS, thread_name_prefix="webhook-analysis")
+
+def token_stage(ctx):
+    # Fetched up front to overlap the clone; later stages go through
+    # with_installation_token so a revoked token is replaced
+    ctx.access_token = generate_installation_token(ctx.payload["installation"]["id"])
 
-        access_token = generate_installation_token(installation_id)
-        pr_files_data = get_pr_files(repo_full_name, pr_number, access_token)
-        changed_files = pr_files_data["changed_files"]
-        diff_text = pr_files_data["diff_text"]
-        temp_dir = tempfile.mkdtemp()
-        subprocess.run(
-            ["git", "clone", "--depth", "1", "--branch",
-             payload["pull_request"]["head"]["ref"],
-             repo_clone_url, temp_dir],
-            check=True
+def pr_files_stage(ctx):
+    pr_files_data = with_installation_token(
+        ctx.payload["installation"]["id"],
+        lambda token: get_pr_files(
+            ctx.payload["repository"]["full_name"],
+            ctx.payload["pull_request"]["number"],
+            token
         )
-        try:
-            pr_data = calculate_pr_risk(
-                repo_path=temp_dir,
-                changed_files=changed_files, 
-                diff_text=diff_text
-            )
-            pr_data["ai_analysis"] = generate_llm_review(pr_data)
-            pr_data.update(build_enterprise_decision(pr_data))
-            pr_data.update(compute_hybrid_merge_decision(pr_data))
-            # Deterministic override: governance wins over AI
-            governance_level = pr_data["hybrid_governance"]["governance_level"]
-            final_decision = pr_data["hybrid_governance"]["final_merge_decision"]
-            if governance_level == "CRITICAL":
-                pr_data["ai_analysis"]["merge_readiness"] = "LOW"
-            # Format high risk modules as bullet list
-            clean_modules = []
-            for module in pr_data["high_risk_modules"]:
-                # Split in case newline slipped inside
-                parts = module.splitlines()
-                for p in parts:
-                    p = p.strip()
-                    if p:
-                        clean_modules.append(p)
-            high_risk_modules_list = [f"- `{m}`" for m in clean_modules]
-            high_risk_modules = "\n".join(high_risk_modules_list)
-            # Sanitize AI output to preserve __init__.py formatting
-            review_focus = pr_data["ai_analysis"]["review_focus"]
-            testing_strategy = pr_data["ai_analysis"]["testing_strategy"]
-            risk_explanation = pr_data["ai_analysis"]["risk_explanation"]
-            for module in pr_data["high_risk_modules"]:
-                review_focus = review_focus.replace(module, f"`{module}`")
-                testing_strategy = testing_strategy.replace(module, f"`{module}`")
-                risk_explanation = risk_explanation.replace(module, f"`{module}`")
-            print(diff_text[:300])
-            # 🔥 THIS IS THE ONLY REAL FIX
-            comment_body = f"""## 🚨 PR Governance Report
+    )
+    ctx.changed_files = pr_files_data["changed_files"]
+    ctx.diff = pr_files_data["diff"]
+
+def format_governance_comment(pr_data: dict) -> str:
+    # Format high risk modules as bullet list
+    clean_modules = []
+    for module in pr_data["high_risk_modules"]:
+        # Split in case newline slipped inside
+        parts = module.splitlines()
+        for p in parts:
+            p = p.strip()
+            if p:
+                clean_modules.append(p)
+    high_risk_modules_list = [f"- `{m}`" for m in clean_modules]
+    high_risk_modules = "\n".join(high_risk_modules_list)
+    # Sanitize AI output to preserve __init__.py formatting
+    review_focus = pr_data["ai_analysis"]["review_focus"]
+    testing_strategy = pr_data["ai_analysis"]["testing_strategy"]
+    risk_explanation = pr_data["ai_analysis"]["risk_explanation"]
+    for module in pr_data["high_risk_modules"]:
+        review_focus = review_focus.replace(module, f"`{module}`")
+        testing_strategy = testing_strategy.replace(module, f"`{module}`")
+        risk_explanation = risk_explanation.replace(module, f"`{module}`")
+    # 🔥 THIS IS THE ONLY REAL FIX
+    comment_body = f"""## 🚨 PR Governance Report
 
 **Risk Score:** {pr_data['pr_risk_score']}  
 **Classification:** {pr_data['classification']}  
@@ -107,18 +98,66 @@ def process_pr_event(payload: dict):
 **Recommended Actions:**  
 {chr(10).join([f"- {a}" for a in pr_data["ai_analysis"]["recommended_actions"]])}
 """.strip()
-            post_pr_comment(repo_full_name, pr_number, access_token, comment_body)
-            logger.info(f"PR #{pr_number} processed successfully.")
-            print("COMMENT LENGTH:", len(comment_body))
-        finally:
-            shutil.rmtree(temp_dir)
+    return comment_body
+
+def comment_stage(ctx):
+    diff = ctx.diff_parser
+    print("DIFF:", diff.lines, "lines,", len(diff.files), "files, sampled:", diff.truncated)
+    ctx.comment_body = format_governance_comment(ctx.result)
+    with_installation_token(
+        ctx.payload["installation"]["id"],
+        lambda token: post_pr_comment(
+            ctx.payload["repository"]["full_name"],
+            ctx.payload["pull_request"]["number"],
+            token,
+            ctx.comment_body
+        )
+    )
+    print("COMMENT LENGTH:", len(ctx.comment_body))
+
+# Token and files list/diff overlap the clone in full checkout mode
+WEBHOOK_PIPELINE = Pipeline([
+    Stage("token", token_stage, provides=("access_token",), run="thread"),
+    Stage("pr_files", pr_files_stage, requires=("access_token",), provides=("changed_files", "diff"), run="thread"),
+    *analysis_stages(async_llm=False),
+    Stage("comment", comment_stage, requires=("result", "access_token"), provides=("comment_body",), run="thread")
+], name="webhook", executor=WEBHOOK_EXECUTOR)
+
+def process_pr_event(payload: dict, job=None):
+    # ``job`` is set when run by the scheduler; check() aborts superseded runs
+    check = job.check if job is not None else None
+    try:
+        repo_full_name = payload["repository"]["full_name"]
+        pr_number = payload["pull_request"]["number"]
+        logger.info(f"Processing PR #{pr_number} for {repo_full_name}")
+        ctx = PRContext(
+            repo_url=payload["repository"]["clone_url"],
+            # The exact head the scheduler accepted, not wherever the branch is now
+            ref=payload["pull_request"]["head"]["sha"],
+            # On synchronize the previous head was analyzed already; patch
+            # its graph with this PR's files instead of rebuilding
+            base_commit=payload.get("before") if payload.get("action") == "synchronize" else None,
+            payload=payload
+        )
+        # Workers bound concurrency here; the stage semaphores belong to
+        # the server's event loop
+        asyncio.run(WEBHOOK_PIPELINE.run(ctx, check=check, limits=False))
+        logger.info(f"PR #{pr_number} processed successfully in {ctx.timings}")
+    except JobCancelled:
+        raise
     except Exception as e:
         logger.exception("Error processing PR")
 
+WEBHOOK_SCHEDULER = JobScheduler(
+    "webhook",
+    process_pr_event,
+    workers=WEBHOOK_WORKERS,
+    max_queue=WEBHOOK_QUEUE_MAX
+)
+
 @router.post("/github-webhook")
 async def github_webhook(
     request: Request,
-    background_tasks: BackgroundTasks,
     x_github_event: str = Header(None),
     x_hub_signature_256: str = Header(None)
 ):
@@ -129,6 +168,23 @@ async def github_webhook(
     if x_github_event == "pull_request":
         action = payload.get("action")
         if action in ["opened", "reopened", "synchronize"]:
-            background_tasks.add_task(process_pr_event, payload)
-            return {"status": "accepted"}
-    return {"status": "ignored"}
\ No newline at end of file
+            # Only the newest head of a PR is analyzed; older pushes still
+            # queued or running are superseded, and late redeliveries of
+            # older pushes are dropped
+            pull_request = payload["pull_request"]
+            key = (payload["repository"]["full_name"], pull_request["number"])
+            status = WEBHOOK_SCHEDULER.submit(
+                key,
+                pull_request["head"].get("sha"),
+                payload,
+                order=pull_request.get("updated_at"),
+                previous=payload.get("before") if action == "synchronize" else None
+            )
+            if status == "rejected":
+                raise HTTPException(status_code=503, detail="Webhook queue is full")
+            return {"status": "accepted", "queue": status}
+    return {"status": "ignored"}
+
+@router.get("/webhook-queue")
+def webhook_queue():
+    return WEBHOOK_SCHEDULER.stats()
\ No newline at end of file
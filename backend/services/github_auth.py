@@ -2,63 +2,136 @@ import os
 import jwt
 import time
 import requests
+from datetime import datetime
+from utils.diff_parser import DiffParser
+from services.github_client import github_request, get_paginated, get_fetch_pool, endpoint_label, GITHUB_RESPONSE_BYTES
+from services.token_cache import TokenCache
 GITHUB_APP_ID = os.getenv("GITHUB_APP_ID")
 GITHUB_PRIVATE_KEY = os.getenv("GITHUB_PRIVATE_KEY")
-def generate_jwt():
+# Diff bytes parsed per PR; larger diffs fall back to files-API summaries
+MAX_DIFF_BYTES = int(os.getenv("MAX_DIFF_BYTES", 20 * 1024 * 1024))
+DIFF_CHUNK_BYTES = 64 * 1024
+def _sign_jwt(app_id):
+    now = int(time.time())
     payload = {
-        "iat": int(time.time()),
-        "exp": int(time.time()) + 600,
-        "iss": GITHUB_APP_ID
+        "iat": now,
+        "exp": now + 600,
+        "iss": app_id
     }
     encoded_jwt = jwt.encode(
         payload,
         GITHUB_PRIVATE_KEY,
         algorithm="RS256"
     )
-    return encoded_jwt
-def generate_installation_token(installation_id: int):
-    jwt_token = generate_jwt()
-    headers = {
-        "Authorization": f"Bearer {jwt_token}",
-        "Accept": "application/vnd.github+json"
-    }
-    response = requests.post(
-        f"https://api.github.com/app/installations/{installation_id}/access_tokens",
-        headers=headers
+    return encoded_jwt, payload["exp"]
+
+def _is_unauthorized(error):
+    return error.response is not None and error.response.status_code == 401
+
+def _request_installation_token(installation_id):
+    response = github_request(
+        "POST",
+        f"/app/installations/{installation_id}/access_tokens",
+        generate_jwt(),
+        scheme="Bearer"
     )
     response.raise_for_status()
-    return response.json()["token"]
+    return response
+
+def _fetch_installation_token(installation_id):
+    try:
+        response = _request_installation_token(installation_id)
+    except requests.HTTPError as e:
+        if not _is_unauthorized(e):
+            raise
+        # The cached app JWT was rejected; sign a fresh one once
+        JWT_CACHE.invalidate(GITHUB_APP_ID)
+        response = _request_installation_token(installation_id)
+    data = response.json()
+    expires_at = datetime.fromisoformat(data["expires_at"].replace("Z", "+00:00")).timestamp()
+    return data["token"], expires_at
+
+# App JWTs live 10 minutes and installation tokens an hour; both are reused
+JWT_CACHE = TokenCache("jwt", _sign_jwt, refresh_margin=60, background_window=0)
+INSTALLATION_TOKEN_CACHE = TokenCache("installation", _fetch_installation_token)
+
+def generate_jwt():
+    return JWT_CACHE.get(GITHUB_APP_ID)
+
+def generate_installation_token(installation_id: int):
+    return INSTALLATION_TOKEN_CACHE.get(installation_id)
+
+def with_installation_token(installation_id: int, call):
+    """Return ``call(token)``; a 401 drops the cached token and retries once.
+
+    A revoked or rotated token would otherwise keep failing until it
+    neared expiry.
+    """
+    try:
+        return call(generate_installation_token(installation_id))
+    except requests.HTTPError as e:
+        if not _is_unauthorized(e):
+            raise
+        INSTALLATION_TOKEN_CACHE.invalidate(installation_id)
+        return call(generate_installation_token(installation_id))
+
+def fetch_pr_diff(repo_full_name: str, pr_number: int, access_token: str, max_bytes=None):
+    """Stream the PR's unified diff into a DiffParser.
+
+    Returns ``(diff, complete)``; ``complete`` is False when the diff was cut
+    at ``max_bytes`` or refused by GitHub, and the caller must fill the rest
+    in from file summaries.
+    """
+    diff = DiffParser()
+    with github_request(
+        "GET",
+        f"/repos/{repo_full_name}/pulls/{pr_number}",
+        access_token,
+        accept="application/vnd.github.v3.diff",
+        stream=True
+    ) as diff_response:
+        # GitHub refuses diffs over its own limits with 406
+        if diff_response.status_code == 406:
+            return diff, False
+        diff_response.raise_for_status()
+        return diff, stream_diff(diff_response, diff, max_bytes)
 
 def get_pr_files(repo_full_name: str, pr_number: int, access_token: str):
-    # 1️⃣ Get changed file names
-    files_url = f"https://api.github.com/repos/{repo_full_name}/pulls/{pr_number}/files"
-    headers_json = {
-        "Authorization": f"token {access_token}",
-        "Accept": "application/vnd.github+json"
-    }
-    response = requests.get(files_url, headers=headers_json)
-    response.raise_for_status()
-    files = response.json()
+    # The diff streams on a pool thread while the files list pages in here
+    diff_future = get_fetch_pool().submit(fetch_pr_diff, repo_full_name, pr_number, access_token)
+    files = get_paginated(f"/repos/{repo_full_name}/pulls/{pr_number}/files", access_token)
     changed_files = [file["filename"] for file in files]
-    # 2️⃣ Get FULL unified diff (CRITICAL FIX)
-    diff_url = f"https://api.github.com/repos/{repo_full_name}/pulls/{pr_number}"
-    headers_diff = {
-        "Authorization": f"token {access_token}",
-        "Accept": "application/vnd.github.v3.diff"
-    }
-    diff_response = requests.get(diff_url, headers=headers_diff)
-    diff_response.raise_for_status()
-    diff_text = diff_response.text
+    diff, complete = diff_future.result()
+    if not complete:
+        diff.complete_from_summaries(files)
     return {
         "changed_files": changed_files,
-        "diff_text": diff_text
+        "diff": diff
     }
 
+def stream_diff(response, diff, max_bytes=None):
+    """Feed ``response`` into ``diff``; False if it stopped at ``max_bytes``."""
+    max_bytes = MAX_DIFF_BYTES if max_bytes is None else max_bytes
+    received = 0
+    try:
+        for chunk in response.iter_content(chunk_size=DIFF_CHUNK_BYTES):
+            if received + len(chunk) > max_bytes:
+                diff.feed(chunk[:max_bytes - received])
+                received = max_bytes
+                print(f"DIFF CAP REACHED: {max_bytes} bytes, using file summaries")
+                return False
+            received += len(chunk)
+            diff.feed(chunk)
+    finally:
+        GITHUB_RESPONSE_BYTES.inc(received, endpoint=endpoint_label(response.url or "/diff"))
+    diff.close()
+    return True
+
 def post_pr_comment(repo_full_name: str, pr_number: int, access_token: str, body: str):
-    url = f"https://api.github.com/repos/{repo_full_name}/issues/{pr_number}/comments"
-    headers = {
-        "Authorization": f"token {access_token}",
-        "Accept": "application/vnd.github+json"
-    }
-    response = requests.post(url, headers=headers, json={"body": body})
-    response.raise_for_status()
\ No newline at end of file
+    response = github_request(
+        "POST",
+        f"/repos/{repo_full_name}/issues/{pr_number}/comments",
+        access_token,
+        json={"body": body}
+    )
+    response.raise_for_status()
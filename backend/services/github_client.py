@@ -0,0 +1,136 @@
+import os, re, time, threading
+from urllib.parse import urlparse, parse_qs
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from core.metrics import counter, gauge, histogram
+from utils.logger import get_logger
+
+logger = get_logger("github-client")
+
+# Point at a local fake server in tests, or at a GitHub Enterprise API root
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com").rstrip("/")
+GITHUB_POOL_SIZE = int(os.getenv("GITHUB_POOL_SIZE", 16))
+GITHUB_FETCH_WORKERS = int(os.getenv("GITHUB_FETCH_WORKERS", 4))
+GITHUB_TIMEOUT = float(os.getenv("GITHUB_TIMEOUT", 30))
+GITHUB_PER_PAGE = 100
+
+GITHUB_REQUEST_SECONDS = histogram(
+    "github_request_seconds", "GitHub API latency until response headers", ("method", "endpoint")
+)
+GITHUB_REQUESTS = counter(
+    "github_requests_total", "GitHub API requests by response status", ("method", "endpoint", "status")
+)
+GITHUB_RESPONSE_BYTES = counter(
+    "github_response_bytes_total", "GitHub API response body bytes read", ("endpoint",)
+)
+GITHUB_RATE_LIMIT_REMAINING = gauge(
+    "github_rate_limit_remaining", "X-RateLimit-Remaining of the latest GitHub response"
+)
+
+_SESSION = None
+_SESSION_LOCK = threading.Lock()
+_FETCH_POOL = None
+_FETCH_POOL_LOCK = threading.Lock()
+
+def get_session():
+    """Process-wide keep-alive session; connections are reused across calls."""
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            session = requests.Session()
+            # Idempotent reads retry transient gateway errors; POSTs never retry
+            retry = Retry(
+                total=3,
+                backoff_factor=0.5,
+                status_forcelist=(502, 503, 504),
+                allowed_methods=frozenset({"GET", "HEAD"})
+            )
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=GITHUB_POOL_SIZE, max_retries=retry)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _SESSION = session
+        return _SESSION
+
+def get_fetch_pool():
+    global _FETCH_POOL
+    with _FETCH_POOL_LOCK:
+        if _FETCH_POOL is None:
+            _FETCH_POOL = ThreadPoolExecutor(max_workers=GITHUB_FETCH_WORKERS, thread_name_prefix="github-fetch")
+        return _FETCH_POOL
+
+def api_url(path):
+    if path.startswith(("http://", "https://")):
+        return path
+    return GITHUB_API_URL + "/" + path.lstrip("/")
+
+def auth_headers(token, accept="application/vnd.github+json", scheme="token"):
+    return {
+        "Authorization": f"{scheme} {token}",
+        "Accept": accept
+    }
+
+def endpoint_label(url):
+    # Bounded label values: owner, repo and numbers are templated out
+    path = urlparse(api_url(url)).path
+    base = urlparse(GITHUB_API_URL).path
+    if base and path.startswith(base):
+        path = path[len(base):]
+    path = re.sub(r"^/repos/[^/]+/[^/]+", "/repos/{repo}", path)
+    return re.sub(r"/\d+(?=/|$)", "/{id}", path) or "/"
+
+def github_request(method, path, token=None, accept="application/vnd.github+json", scheme="token", **kwargs):
+    headers = auth_headers(token, accept, scheme) if token else {"Accept": accept}
+    headers.update(kwargs.pop("headers", {}))
+    kwargs.setdefault("timeout", GITHUB_TIMEOUT)
+    endpoint = endpoint_label(path)
+    started = time.perf_counter()
+    try:
+        response = get_session().request(method, api_url(path), headers=headers, **kwargs)
+    except requests.RequestException:
+        GITHUB_REQUESTS.inc(method=method, endpoint=endpoint, status="error")
+        raise
+    finally:
+        GITHUB_REQUEST_SECONDS.observe(time.perf_counter() - started, method=method, endpoint=endpoint)
+    GITHUB_REQUESTS.inc(method=method, endpoint=endpoint, status=response.status_code)
+    if not kwargs.get("stream"):
+        # Streamed bodies are counted by whoever reads them
+        GITHUB_RESPONSE_BYTES.inc(len(response.content), endpoint=endpoint)
+    remaining = response.headers.get("X-RateLimit-Remaining")
+    if remaining is not None and remaining.isdigit():
+        GITHUB_RATE_LIMIT_REMAINING.set(int(remaining))
+    return response
+
+def _get_page(path, token, params, page):
+    response = github_request("GET", path, token, params=dict(params, page=page))
+    response.raise_for_status()
+    return response.json()
+
+def get_paginated(path, token, params=None):
+    """Every item of a paginated list endpoint, in page order.
+
+    The first page's ``Link`` header names the last page; the remaining
+    pages are then fetched concurrently. Without a ``last`` link (some
+    endpoints only send ``next``) pages are followed one by one.
+    """
+    params = dict(params or {}, per_page=GITHUB_PER_PAGE)
+    response = github_request("GET", path, token, params=dict(params, page=1))
+    response.raise_for_status()
+    items = list(response.json())
+    links = response.links
+    last = links.get("last", {}).get("url")
+    if last:
+        last_page = int(parse_qs(urlparse(last).query)["page"][0])
+        logger.info(f"Fetching {last_page} pages of {path}")
+        pool = get_fetch_pool()
+        pages = [pool.submit(_get_page, path, token, params, page) for page in range(2, last_page + 1)]
+        for future in pages:
+            items.extend(future.result())
+        return items
+    while "next" in links:
+        response = github_request("GET", links["next"]["url"], token)
+        response.raise_for_status()
+        items.extend(response.json())
+        links = response.links
+    return items
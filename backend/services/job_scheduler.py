@@ -0,0 +1,182 @@
+import time, threading
+from collections import OrderedDict, deque
+from core.metrics import register_collector
+from utils.logger import get_logger
+
+logger = get_logger("job-scheduler")
+
+# Every JobScheduler registers here so its queue can be scraped
+SCHEDULERS = {}
+
+class JobCancelled(Exception):
+    """Raised inside a handler once a newer event superseded its job."""
+
+class Job:
+    __slots__ = ("key", "version", "payload", "order", "previous", "enqueued_at", "started_at", "_cancelled")
+
+    def __init__(self, key, version, payload, order=None, previous=None):
+        self.key = key
+        self.version = version
+        self.payload = payload
+        self.order = order
+        self.previous = previous
+        self.enqueued_at = time.monotonic()
+        self.started_at = None
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def check(self):
+        """Call between stages; aborts the handler if the job was superseded."""
+        if self._cancelled.is_set():
+            raise JobCancelled(f"{self.key} superseded by a newer event")
+
+class JobScheduler:
+    """Bounded worker pool that keeps at most one pending job per key.
+
+    ``submit(key, version, payload)`` coalesces by ``key`` (e.g. repo and
+    PR number): a newer version replaces a queued job in place, and a
+    running job for the key is cancelled cooperatively (its handler sees
+    ``job.check()`` raise). A late delivery of an older event, one whose
+    ``order`` sorts before the latest job's or whose version is the one
+    the latest job replaced (``previous``), is dropped as stale instead.
+    Jobs for one key never run concurrently, and new keys are rejected
+    once ``max_queue`` jobs are waiting.
+    """
+    def __init__(self, name, handler, workers=2, max_queue=100):
+        self.name = name
+        self.handler = handler
+        self.workers = workers
+        self.max_queue = max_queue
+        self._pending = OrderedDict()  # key -> Job, in arrival order
+        self._running = {}             # key -> Job
+        self._cond = threading.Condition()
+        self._threads = []
+        self._waits = deque(maxlen=1000)
+        self.counters = {
+            "submitted": 0, "coalesced": 0, "superseded": 0, "duplicates": 0,
+            "stale": 0, "rejected": 0, "completed": 0, "cancelled": 0, "failed": 0
+        }
+        SCHEDULERS[name] = self
+
+    def _start_workers(self):
+        # Caller holds the condition's lock
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(
+                target=self._worker,
+                name=f"{self.name}-worker-{len(self._threads)}",
+                daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    @staticmethod
+    def _is_stale(latest, version, order):
+        if version is not None and latest.previous == version:
+            return True
+        return order is not None and latest.order is not None and order < latest.order
+
+    def submit(self, key, version, payload, order=None, previous=None):
+        """Queue a job; returns "queued", "coalesced", "duplicate", "stale" or "rejected"."""
+        with self._cond:
+            self._start_workers()
+            running = self._running.get(key)
+            pending = self._pending.get(key)
+            latest = pending or running
+            if latest is not None and version is not None and latest.version == version:
+                self.counters["duplicates"] += 1
+                return "duplicate"
+            if latest is not None and self._is_stale(latest, version, order):
+                self.counters["stale"] += 1
+                return "stale"
+            if running is not None and not running.cancelled():
+                running.cancel()
+                self.counters["superseded"] += 1
+            if pending is not None:
+                # Keep the queue slot and first-seen time; only the head moves
+                pending.version = version
+                pending.payload = payload
+                pending.order = order
+                pending.previous = previous
+                self.counters["coalesced"] += 1
+                return "coalesced"
+            if len(self._pending) >= self.max_queue:
+                self.counters["rejected"] += 1
+                return "rejected"
+            self._pending[key] = Job(key, version, payload, order, previous)
+            self.counters["submitted"] += 1
+            self._cond.notify()
+            return "queued"
+
+    def _next_job(self):
+        for key, job in self._pending.items():
+            if key not in self._running:
+                return job
+        return None
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                job = self._next_job()
+                while job is None:
+                    self._cond.wait()
+                    job = self._next_job()
+                del self._pending[job.key]
+                self._running[job.key] = job
+                job.started_at = time.monotonic()
+                self._waits.append(job.started_at - job.enqueued_at)
+            try:
+                self.handler(job.payload, job)
+                outcome = "cancelled" if job.cancelled() else "completed"
+            except JobCancelled as e:
+                logger.info(str(e))
+                outcome = "cancelled"
+            except Exception:
+                logger.exception(f"Job {job.key} failed")
+                outcome = "failed"
+            with self._cond:
+                del self._running[job.key]
+                self.counters[outcome] += 1
+                # A newer job for this key may have been waiting on it
+                self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            waits = sorted(self._waits)
+            now = time.monotonic()
+            oldest = min((job.enqueued_at for job in self._pending.values()), default=None)
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "queue_depth": len(self._pending),
+                "running": len(self._running),
+                "oldest_pending_seconds": round(now - oldest, 3) if oldest is not None else 0,
+                "wait_seconds": {
+                    "count": len(waits),
+                    "avg": round(sum(waits) / len(waits), 3) if waits else 0,
+                    "p50": round(waits[len(waits) // 2], 3) if waits else 0,
+                    "p95": round(waits[int(len(waits) * 0.95)], 3) if waits else 0,
+                    "max": round(waits[-1], 3) if waits else 0
+                },
+                **self.counters
+            }
+
+def _collect_schedulers():
+    stats = {name: scheduler.stats() for name, scheduler in list(SCHEDULERS.items())}
+    for key, help in (
+        ("queue_depth", "Jobs waiting for a worker"),
+        ("running", "Jobs being processed"),
+        ("oldest_pending_seconds", "Age of the oldest waiting job")
+    ):
+        yield f"scheduler_{key}", "gauge", help, [({"scheduler": n}, s[key]) for n, s in sorted(stats.items())]
+    yield "scheduler_jobs_total", "counter", "Scheduler job events by outcome", [
+        ({"scheduler": n, "event": event}, s[event])
+        for n, s in sorted(stats.items())
+        for event in ("submitted", "coalesced", "superseded", "duplicates", "stale", "rejected", "completed", "cancelled", "failed")
+    ]
+
+register_collector(_collect_schedulers)
@@ -0,0 +1,299 @@
+import os, re, time, uuid, fcntl, shutil, asyncio, threading, subprocess, tempfile
+from contextlib import contextmanager, asynccontextmanager
+from core.graph_store import repo_key
+from agents.impact_engine import sparse_checkout_patterns
+from core.metrics import counter, histogram
+from utils.logger import get_logger
+
+logger = get_logger("repo-mirror")
+
+REPO_MIRROR_DIR = os.getenv(
+    "REPO_MIRROR_DIR",
+    os.path.join(tempfile.gettempdir(), "pr-risk-mirrors")
+)
+# Total disk the bare mirrors may use before least recently used ones go
+REPO_MIRROR_MAX_BYTES = int(os.getenv("REPO_MIRROR_MAX_BYTES", 5 * 1024 ** 3))
+GIT_FETCH_TIMEOUT = int(os.getenv("GIT_FETCH_TIMEOUT", 120))
+# "full" checks out every file; "sparse" fetches trees only (blob:none) and
+# materialises just the sources, manifests and changed files
+REPO_CHECKOUT_MODE = os.getenv("REPO_CHECKOUT_MODE", "full")
+# A commit fetched this recently is reused by jobs queued behind the fetch
+MIRROR_FETCH_TTL = float(os.getenv("MIRROR_FETCH_TTL", 10))
+
+_FETCHED = {}  # (mirror, commit, sparse) -> fetched_at; shared by all mirrors
+_FETCHED_LOCK = threading.Lock()
+_COMMIT_SHA = re.compile(r"[0-9a-f]{40}")
+
+GIT_COMMAND_SECONDS = histogram("git_command_seconds", "Wall time of git subcommands", ("command",))
+GIT_COMMAND_ERRORS = counter("git_command_errors_total", "git subcommands that failed or timed out", ("command",))
+MIRROR_EVICTIONS = counter("mirror_evictions_total", "Bare mirrors deleted to respect REPO_MIRROR_MAX_BYTES")
+
+def _git_command(args):
+    # "fetch", "worktree add", ...: the subcommand after any global options
+    rest = list(args)
+    while rest and rest[0] in ("--git-dir", "-C"):
+        rest = rest[2:]
+    if not rest:
+        return "git"
+    if rest[0] in ("worktree", "sparse-checkout") and len(rest) > 1:
+        return f"{rest[0]} {rest[1]}"
+    return rest[0]
+
+def _run_git(args, timeout=60, input=None):
+    command = _git_command(args)
+    with GIT_COMMAND_SECONDS.time(command=command):
+        try:
+            result = subprocess.run(
+                ["git", *args],
+                capture_output=True,
+                text=True,
+                timeout=timeout,
+                input=input
+            )
+        except subprocess.TimeoutExpired:
+            GIT_COMMAND_ERRORS.inc(command=command)
+            raise
+    if result.returncode != 0:
+        GIT_COMMAND_ERRORS.inc(command=command)
+        raise RuntimeError(f"git {' '.join(args)} failed: {result.stderr.strip()}")
+    return result.stdout
+
+async def _arun_git(args, timeout=60, input=None):
+    command = _git_command(args)
+    with GIT_COMMAND_SECONDS.time(command=command):
+        try:
+            return await _arun_git_process(args, timeout, input)
+        except (RuntimeError, subprocess.TimeoutExpired):
+            GIT_COMMAND_ERRORS.inc(command=command)
+            raise
+
+async def _arun_git_process(args, timeout, input):
+    process = await asyncio.create_subprocess_exec(
+        "git", *args,
+        stdin=asyncio.subprocess.PIPE if input is not None else None,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(
+            process.communicate(input.encode() if input is not None else None),
+            timeout
+        )
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        raise subprocess.TimeoutExpired(["git", *args], timeout)
+    if process.returncode != 0:
+        raise RuntimeError(f"git {' '.join(args)} failed: {stderr.decode(errors='replace').strip()}")
+    return stdout.decode()
+
+@contextmanager
+def _flock(path, mode=fcntl.LOCK_EX):
+    # flock works across processes and across separate opens in one process
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a") as f:
+        fcntl.flock(f, mode)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+@asynccontextmanager
+async def _aflock(path, mode=fcntl.LOCK_EX):
+    # Blocking flock waits on a worker thread so the event loop keeps running
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a") as f:
+        await asyncio.to_thread(fcntl.flock, f, mode)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+def mirror_path(repo_url):
+    return os.path.join(REPO_MIRROR_DIR, "mirrors", repo_key(repo_url) + ".git")
+
+def _forget_fetches(mirror):
+    with _FETCHED_LOCK:
+        for key in [key for key in _FETCHED if key[0] == mirror]:
+            del _FETCHED[key]
+
+def _fetched_at(key):
+    with _FETCHED_LOCK:
+        return _FETCHED.get(key)
+
+def _record_fetch(key):
+    now = time.monotonic()
+    with _FETCHED_LOCK:
+        # Entries past the TTL are never reused; drop them so the dict stays small
+        for old in [k for k, at in _FETCHED.items() if now - at >= MIRROR_FETCH_TTL]:
+            del _FETCHED[old]
+        _FETCHED[key] = now
+
+def _prepare_steps(mirror, repo_url, worktree, ref, paths, sparse):
+    """Git commands that fetch ``ref`` into ``mirror`` and add ``worktree``.
+
+    Yields ``(args, timeout, input)`` and is sent each command's stdout, so
+    the same sequence runs on subprocess.run (checkout) or on asyncio
+    subprocesses (acheckout). Returns the checked out commit.
+    """
+    if not os.path.exists(os.path.join(mirror, "HEAD")):
+        # Evicted (possibly by another process): nothing fetched survives
+        _forget_fetches(mirror)
+        yield ["init", "--bare", "--quiet", mirror], 60, None
+    # Worktrees read origin from here, so graph cache keys still resolve
+    yield ["--git-dir", mirror, "config", "remote.origin.url", repo_url], 60, None
+    fetch = ["--git-dir", mirror, "fetch", "--quiet", "--depth", "1", "--no-tags"]
+    if sparse:
+        # Missing blobs are fetched lazily from the promisor remote on checkout
+        yield ["--git-dir", mirror, "config", "remote.origin.promisor", "true"], 60, None
+        yield ["--git-dir", mirror, "config", "remote.origin.partialclonefilter", "blob:none"], 60, None
+        fetch.append("--filter=blob:none")
+    # Only a pinned commit can be reused: a branch may have moved since the
+    # last fetch, and its new head must not be reviewed against the old tree
+    pinned = _COMMIT_SHA.fullmatch(ref) is not None
+    fetched_at = _fetched_at((mirror, ref, sparse)) if pinned else None
+    if fetched_at is not None and time.monotonic() - fetched_at < MIRROR_FETCH_TTL:
+        commit = ref
+    else:
+        yield fetch + ["origin", ref], GIT_FETCH_TIMEOUT, None
+        commit = (yield ["--git-dir", mirror, "rev-parse", "FETCH_HEAD^{commit}"], 60, None).strip()
+        if pinned and commit != ref:
+            raise RuntimeError(f"Fetched {commit} for {ref}")
+        _record_fetch((mirror, commit, sparse))
+    if not sparse:
+        yield ["--git-dir", mirror, "worktree", "add", "--detach", "--quiet", worktree, commit], 60, None
+        return commit
+    yield ["--git-dir", mirror, "worktree", "add", "--detach", "--no-checkout", "--quiet", worktree, commit], 60, None
+    patterns = "\n".join(sparse_checkout_patterns(paths or ())) + "\n"
+    yield ["-C", worktree, "sparse-checkout", "set", "--no-cone", "--stdin"], 60, patterns
+    # Populate index and files; only blobs matching the patterns are fetched
+    yield ["-C", worktree, "read-tree", "-mu", "HEAD"], GIT_FETCH_TIMEOUT, None
+    return commit
+
+def _cleanup_steps(mirror, worktree):
+    try:
+        yield ["--git-dir", mirror, "worktree", "remove", "--force", worktree], 60, None
+    except (RuntimeError, subprocess.TimeoutExpired) as e:
+        logger.warning(f"Worktree cleanup failed: {e}")
+        shutil.rmtree(worktree, ignore_errors=True)
+        yield ["--git-dir", mirror, "worktree", "prune"], 60, None
+
+def _drive(steps):
+    try:
+        request = next(steps)
+        while True:
+            try:
+                output = _run_git(*request)
+            except (RuntimeError, subprocess.TimeoutExpired) as e:
+                request = steps.throw(e)
+            else:
+                request = steps.send(output)
+    except StopIteration as done:
+        return done.value
+
+async def _adrive(steps):
+    try:
+        request = next(steps)
+        while True:
+            try:
+                output = await _arun_git(*request)
+            except (RuntimeError, subprocess.TimeoutExpired) as e:
+                request = steps.throw(e)
+            else:
+                request = steps.send(output)
+    except StopIteration as done:
+        return done.value
+
+def _new_worktree_path():
+    return os.path.join(REPO_MIRROR_DIR, "worktrees", uuid.uuid4().hex)
+
+@contextmanager
+def checkout(repo_url, ref=None, paths=None, mode=None):
+    """Yield a detached worktree of ``ref`` (default branch when None).
+
+    Each repository has one bare mirror under REPO_MIRROR_DIR; only the
+    requested ref is fetched (``--depth 1``) and checked out into a
+    throwaway ``git worktree``. Git mutations of a mirror are serialized by
+    a write lock, while a shared use lock held for the worktree's lifetime
+    keeps eviction away from mirrors that are being read.
+
+    In "sparse" ``mode`` (REPO_CHECKOUT_MODE) the worktree only contains
+    the files the analyzers read plus ``paths``; the index still lists
+    every tracked file, so blob-keyed graph caching is unaffected.
+    """
+    sparse = (mode or REPO_CHECKOUT_MODE) == "sparse"
+    mirror = mirror_path(repo_url)
+    worktree = _new_worktree_path()
+    with _flock(mirror + ".use", fcntl.LOCK_SH):
+        with _flock(mirror + ".lock"):
+            commit = _drive(_prepare_steps(mirror, repo_url, worktree, ref or "HEAD", paths, sparse))
+        os.utime(mirror)
+        logger.info(f"Checked out {commit[:12]} of {repo_url} ({'sparse' if sparse else 'full'})")
+        try:
+            yield worktree
+        finally:
+            with _flock(mirror + ".lock"):
+                _drive(_cleanup_steps(mirror, worktree))
+    evict_mirrors()
+
+@asynccontextmanager
+async def acheckout(repo_url, ref=None, paths=None, mode=None):
+    """Async checkout(): git runs as asyncio subprocesses, locks off-loop."""
+    sparse = (mode or REPO_CHECKOUT_MODE) == "sparse"
+    mirror = mirror_path(repo_url)
+    worktree = _new_worktree_path()
+    async with _aflock(mirror + ".use", fcntl.LOCK_SH):
+        async with _aflock(mirror + ".lock"):
+            commit = await _adrive(_prepare_steps(mirror, repo_url, worktree, ref or "HEAD", paths, sparse))
+        os.utime(mirror)
+        logger.info(f"Checked out {commit[:12]} of {repo_url} ({'sparse' if sparse else 'full'})")
+        try:
+            yield worktree
+        finally:
+            async with _aflock(mirror + ".lock"):
+                await _adrive(_cleanup_steps(mirror, worktree))
+    await asyncio.to_thread(evict_mirrors)
+
+def _dir_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+def evict_mirrors(max_bytes=None):
+    """Delete least recently used mirrors until the total fits ``max_bytes``."""
+    max_bytes = REPO_MIRROR_MAX_BYTES if max_bytes is None else max_bytes
+    root = os.path.join(REPO_MIRROR_DIR, "mirrors")
+    if not os.path.isdir(root):
+        return []
+    mirrors = []
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        if name.endswith(".git") and os.path.isdir(path):
+            mirrors.append((os.path.getmtime(path), path, _dir_size(path)))
+    total = sum(size for _, _, size in mirrors)
+    evicted = []
+    for _, path, size in sorted(mirrors):
+        if total <= max_bytes:
+            break
+        with open(path + ".use", "a") as use:
+            try:
+                # Skip mirrors with live worktrees instead of waiting on them
+                fcntl.flock(use, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                continue
+            try:
+                with _flock(path + ".lock"):
+                    shutil.rmtree(path, ignore_errors=True)
+                    _forget_fetches(path)
+            finally:
+                fcntl.flock(use, fcntl.LOCK_UN)
+        total -= size
+        evicted.append(path)
+        MIRROR_EVICTIONS.inc()
+        logger.info(f"Evicted mirror {path} ({size} bytes)")
+    return evicted
@@ -0,0 +1,118 @@
+import os, time, threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from core.metrics import register_collector
+from utils.logger import get_logger
+
+logger = get_logger("token-cache")
+
+# Stop handing out a token this many seconds before it expires
+TOKEN_REFRESH_MARGIN = int(os.getenv("TOKEN_REFRESH_MARGIN", 300))
+# Within this window of the margin, a hit also starts a background refresh
+TOKEN_BACKGROUND_WINDOW = int(os.getenv("TOKEN_BACKGROUND_WINDOW", 600))
+
+_REFRESH_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="token-refresh")
+
+# Every TokenCache registers here so its counters can be scraped
+TOKEN_CACHES = {}
+
+class TokenCache:
+    """Thread-safe cache of expiring credentials keyed by e.g. installation ID.
+
+    ``fetch(key)`` returns ``(token, expires_at)`` with ``expires_at`` in
+    epoch seconds. A token is reused until ``refresh_margin`` seconds before
+    it expires; once it is within ``background_window`` of that point a hit
+    still returns it but refreshes it on a worker thread. Concurrent misses
+    for the same key share one fetch.
+    """
+    def __init__(self, name, fetch, refresh_margin=None, background_window=None):
+        self.name = name
+        self.fetch = fetch
+        self.refresh_margin = TOKEN_REFRESH_MARGIN if refresh_margin is None else refresh_margin
+        self.background_window = TOKEN_BACKGROUND_WINDOW if background_window is None else background_window
+        self._tokens = {}    # key -> (token, expires_at)
+        self._inflight = {}  # key -> Future of the running fetch
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.fetches = 0
+        self.background_refreshes = 0
+        TOKEN_CACHES[name] = self
+
+    def _start_fetch(self, key):
+        # Caller holds the lock; returns (future, True) if this call owns it
+        future = self._inflight.get(key)
+        if future is not None:
+            return future, False
+        future = Future()
+        self._inflight[key] = future
+        return future, True
+
+    def _run_fetch(self, key, future):
+        try:
+            token, expires_at = self.fetch(key)
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_exception(e)
+            return
+        with self._lock:
+            self._tokens[key] = (token, expires_at)
+            self._inflight.pop(key, None)
+            self.fetches += 1
+        future.set_result(token)
+
+    def _background_refresh(self, key, future):
+        try:
+            self._run_fetch(key, future)
+            future.result()
+        except Exception as e:
+            # The cached token is still valid; the next hit retries
+            logger.warning(f"Background refresh of {self.name} token failed: {e}")
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            cached = self._tokens.get(key)
+            if cached is not None and cached[1] - self.refresh_margin > now:
+                self.hits += 1
+                if cached[1] - self.refresh_margin - self.background_window <= now:
+                    future, owner = self._start_fetch(key)
+                    if owner:
+                        self.background_refreshes += 1
+                        _REFRESH_POOL.submit(self._background_refresh, key, future)
+                return cached[0]
+            future, owner = self._start_fetch(key)
+        if owner:
+            self._run_fetch(key, future)
+        return future.result()
+
+    def invalidate(self, key):
+        """Drop ``key``, e.g. after the API rejected its token with a 401."""
+        with self._lock:
+            self._tokens.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._tokens.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "tokens": len(self._tokens),
+                "inflight": len(self._inflight),
+                "hits": self.hits,
+                "fetches": self.fetches,
+                "background_refreshes": self.background_refreshes
+            }
+
+def _collect_token_caches():
+    stats = {name: cache.stats() for name, cache in list(TOKEN_CACHES.items())}
+    for key, kind, help in (
+        ("hits", "counter", "Credentials served from cache"),
+        ("fetches", "counter", "Credentials fetched or signed"),
+        ("background_refreshes", "counter", "Refreshes started ahead of expiry"),
+        ("tokens", "gauge", "Credentials currently cached")
+    ):
+        name = f"token_cache_{key}_total" if kind == "counter" else f"token_cache_{key}"
+        yield name, kind, help, [({"cache": cache}, s[key]) for cache, s in sorted(stats.items())]
+
+register_collector(_collect_token_caches)
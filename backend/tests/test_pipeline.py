@@ -0,0 +1,113 @@
+import time, asyncio, threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+import pytest
+from core.pipeline import Pipeline, Stage
+from core.stage_limits import stage_stats
+
+@dataclass
+class Context:
+    worktree: Optional[dict] = None
+    scanned: Optional[bool] = None
+    failed: Optional[bool] = None
+    timings: Dict[str, float] = field(default_factory=dict)
+    resources: Any = None
+
+@asynccontextmanager
+async def worktree(events):
+    tree = {"open": True}
+    try:
+        yield tree
+    finally:
+        tree["open"] = False
+        events.append("closed")
+
+def test_failed_stage_waits_for_running_cpu_sibling():
+    events = []
+
+    async def checkout(ctx):
+        ctx.worktree = await ctx.resources.enter_async_context(worktree(events))
+
+    def scan(ctx):
+        time.sleep(0.3)
+        # Still inside the worktree when the thread finally gets here
+        events.append("scanned" if ctx.worktree["open"] else "scanned after close")
+        ctx.scanned = True
+
+    def fail(ctx):
+        time.sleep(0.05)
+        raise RuntimeError("pr files unavailable")
+
+    pipeline = Pipeline([
+        Stage("checkout", checkout, provides=("worktree",)),
+        Stage("scan", scan, requires=("worktree",), provides=("scanned",), run="cpu"),
+        Stage("fail", fail, requires=("worktree",), provides=("failed",), run="thread")
+    ], name="test")
+    with pytest.raises(RuntimeError, match="pr files unavailable"):
+        asyncio.run(pipeline.run(Context(), limits=False))
+    assert events == ["scanned", "closed"]
+
+def test_cancelled_run_waits_for_running_cpu_stage():
+    events = []
+
+    async def checkout(ctx):
+        ctx.worktree = await ctx.resources.enter_async_context(worktree(events))
+
+    def scan(ctx):
+        time.sleep(0.3)
+        events.append("scanned" if ctx.worktree["open"] else "scanned after close")
+
+    pipeline = Pipeline([
+        Stage("checkout", checkout, provides=("worktree",)),
+        Stage("scan", scan, requires=("worktree",), provides=("scanned",), run="cpu")
+    ], name="test")
+
+    async def supersede():
+        run = asyncio.ensure_future(pipeline.run(Context(), limits=False))
+        await asyncio.sleep(0.05)
+        run.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await run
+
+    asyncio.run(supersede())
+    assert events == ["scanned", "closed"]
+
+def test_cancelled_cpu_stage_holds_its_slot_until_the_thread_returns():
+    slots = []
+
+    def scan(ctx):
+        time.sleep(0.3)
+
+    def fail(ctx):
+        time.sleep(0.05)
+        raise RuntimeError("llm unavailable")
+
+    pipeline = Pipeline([
+        Stage("scan", scan, provides=("scanned",), run="cpu", limit="analysis"),
+        Stage("fail", fail, provides=("failed",), run="thread")
+    ], name="test")
+
+    async def watch():
+        run = asyncio.ensure_future(pipeline.run(Context()))
+        await asyncio.sleep(0.15)
+        slots.append(stage_stats()["analysis"]["in_use"])
+        with pytest.raises(RuntimeError):
+            await run
+        slots.append(stage_stats()["analysis"]["in_use"])
+
+    asyncio.run(watch())
+    assert slots == [1, 0]
+
+def test_cpu_stages_run_on_the_pipeline_executor():
+    names = []
+
+    def scan(ctx):
+        names.append(threading.current_thread().name)
+
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="private")
+    pipeline = Pipeline([Stage("scan", scan, provides=("scanned",), run="cpu")], name="test", executor=executor)
+    asyncio.run(pipeline.run(Context(), limits=False))
+    executor.shutdown()
+    assert names and names[0].startswith("private")
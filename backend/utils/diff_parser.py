@@ -0,0 +1,327 @@
+import os, re, heapq
+from dataclasses import dataclass, field
+from typing import Dict, Any
+
+# Diff limits: per-line characters kept for classification, hunk headers
+# kept per file and files listed in the per-file breakdown
+MAX_DIFF_LINE_CHARS = int(os.getenv("MAX_DIFF_LINE_CHARS", 64 * 1024))
+MAX_DIFF_HUNKS_PER_FILE = int(os.getenv("MAX_DIFF_HUNKS_PER_FILE", 200))
+MAX_DIFF_FILE_BREAKDOWN = int(os.getenv("MAX_DIFF_FILE_BREAKDOWN", 100))
+DIFF_CHUNK_CHARS = 1024 * 1024
+
+HUNK_HEADER_RE = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+GIT_HEADER_RE = re.compile(r'^diff --git "?a/(.*?)"? "?b/(.*?)"?$')
+IMPORT_RE = re.compile(r"\b(import|from)\b")
+FUNCTION_SIGNATURE_RE = re.compile(r"\b(async\s+def|def)\s+\w+\(.*\):")
+CLASS_RE = re.compile(r"\bclass\s+\w+")
+API_SURFACE_RE = re.compile(r"def\s+\w+\(|class\s+\w+")
+# Content counters extrapolated from the parsed sample for estimated files
+SAMPLED_COUNTERS = (
+    "import_changes", "function_signature_changes", "class_changes",
+    "api_changes", "signature_changes", "structural_import_changes",
+    "meaningful_changes"
+)
+FILE_STATUS = {"removed": "deleted", "added": "added", "renamed": "renamed"}
+
+@dataclass
+class DiffFile:
+    """Counters for one file of a unified diff; line content is not kept."""
+    path: str
+    old_path: str = None
+    status: str = "modified"
+    hunks: list = field(default_factory=list)
+    hunk_count: int = 0
+    lines_added: int = 0
+    lines_deleted: int = 0
+    import_changes: int = 0
+    function_signature_changes: int = 0
+    class_changes: int = 0
+    api_changes: int = 0
+    signature_changes: int = 0
+    structural_import_changes: int = 0
+    meaningful_changes: int = 0
+    # Counts taken from a files-API summary instead of parsed hunks
+    estimated: bool = False
+
+    def add_line(self, content, added):
+        if added:
+            self.lines_added += 1
+            if ("import" in content or "from" in content) and IMPORT_RE.search(content):
+                self.import_changes += 1
+        else:
+            self.lines_deleted += 1
+        has_def = "def" in content
+        if has_def and FUNCTION_SIGNATURE_RE.search(content):
+            self.function_signature_changes += 1
+        if "class" in content and CLASS_RE.search(content):
+            self.class_changes += 1
+        stripped = content.strip()
+        if not stripped or stripped[0] == "#":
+            return
+        self.meaningful_changes += 1
+        if API_SURFACE_RE.match(stripped):
+            self.api_changes += 1
+        if has_def and "def " in content and "(" in content and ")" in content:
+            self.signature_changes += 1
+        if stripped.startswith(("import ", "from ")):
+            self.structural_import_changes += 1
+
+    def summary(self):
+        return {
+            "file": self.path,
+            "old_file": self.old_path if self.old_path != self.path else None,
+            "status": self.status,
+            "hunks": self.hunk_count,
+            "lines_added": self.lines_added,
+            "lines_deleted": self.lines_deleted,
+            "import_changes": self.import_changes,
+            "function_signature_changes": self.function_signature_changes,
+            "class_changes": self.class_changes,
+            "estimated": self.estimated
+        }
+
+def _diff_path(path):
+    path = path.strip().strip('"')
+    return None if path == "/dev/null" else path
+
+class DiffParser:
+    """Single-pass unified diff parser.
+
+    ``feed`` accepts str or bytes chunks of any size (a streamed HTTP body
+    or a whole diff) and only buffers the current partial line, so memory
+    stays proportional to the number of files, not the diff size. Hunk
+    headers drive line classification, so content lines that look like
+    ``---``/``+++`` headers are still counted.
+    """
+    def __init__(self):
+        self.files = []
+        self.current = None
+        self.lines = 0
+        self.chars = 0
+        self.truncated_lines = 0
+        self.truncated = False
+        self._old_left = 0
+        self._new_left = 0
+        self._tail = None
+
+    def _start_file(self, path, old_path=None):
+        self.current = DiffFile(path=path, old_path=old_path or path)
+        self.files.append(self.current)
+        self._old_left = self._new_left = 0
+        return self.current
+
+    def feed_line(self, line):
+        self.lines += 1
+        current = self.current
+        if self._old_left > 0 or self._new_left > 0:
+            tag = line[:1]
+            if tag == "+":
+                self._new_left -= 1
+                current.add_line(line[1:], True)
+            elif tag == "-":
+                self._old_left -= 1
+                current.add_line(line[1:], False)
+            elif tag != "\\":
+                self._old_left -= 1
+                self._new_left -= 1
+            return
+        line = line.rstrip("\r")
+        if line.startswith("diff --git "):
+            match = GIT_HEADER_RE.match(line)
+            if match:
+                self._start_file(match.group(2), match.group(1))
+            else:
+                self._start_file(line[11:].strip())
+        elif line.startswith("@@"):
+            match = HUNK_HEADER_RE.match(line)
+            if not match:
+                return
+            if current is None:
+                current = self._start_file("")
+            old_start, old_count, new_start, new_count = match.groups()
+            self._old_left = 1 if old_count is None else int(old_count)
+            self._new_left = 1 if new_count is None else int(new_count)
+            current.hunk_count += 1
+            if len(current.hunks) < MAX_DIFF_HUNKS_PER_FILE:
+                current.hunks.append((int(old_start), self._old_left, int(new_start), self._new_left))
+        elif line.startswith("--- "):
+            # Plain (non-git) diffs start each file at its --- header
+            if current is None or current.hunk_count:
+                current = self._start_file("")
+            old_path = _diff_path(line[4:].split("\t")[0])
+            if old_path is None:
+                current.status = "added"
+            else:
+                current.old_path = old_path[2:] if old_path.startswith("a/") else old_path
+                current.path = current.path or current.old_path
+        elif line.startswith("+++ ") and current is not None:
+            new_path = _diff_path(line[4:].split("\t")[0])
+            if new_path is None:
+                current.status = "deleted"
+                current.path = current.old_path
+            else:
+                current.path = new_path[2:] if new_path.startswith("b/") else new_path
+        elif current is None:
+            # Bare +/- lines without headers (hand-written snippets)
+            if line[:1] in ("+", "-"):
+                self._start_file("").add_line(line[1:], line[0] == "+")
+        elif line.startswith("new file mode"):
+            current.status = "added"
+        elif line.startswith("deleted file mode"):
+            current.status = "deleted"
+        elif line.startswith("rename from "):
+            current.status = "renamed"
+            current.old_path = line[12:]
+        elif line.startswith("rename to "):
+            current.status = "renamed"
+            current.path = line[10:]
+        elif line.startswith("Binary files ") or line.startswith("GIT binary patch"):
+            current.status = "binary" if current.status == "modified" else current.status
+        elif line[:1] in ("+", "-") and not current.hunk_count:
+            current.add_line(line[1:], line[0] == "+")
+
+    def feed(self, chunk):
+        """Consume a str or bytes chunk; a trailing partial line is buffered."""
+        if not chunk:
+            return
+        self.chars += len(chunk)
+        end = chunk.rfind(b"\n" if isinstance(chunk, bytes) else "\n")
+        if end == -1:
+            rest, chunk = chunk, None
+        else:
+            rest, chunk = chunk[end + 1:], chunk[:end]
+            if self._tail is not None:
+                chunk = self._tail + chunk
+                self._tail = None
+            if isinstance(chunk, bytes):
+                chunk = chunk.decode("utf-8", errors="replace")
+            for line in chunk.split("\n"):
+                if len(line) > MAX_DIFF_LINE_CHARS:
+                    self.truncated_lines += 1
+                    line = line[:MAX_DIFF_LINE_CHARS]
+                self.feed_line(line)
+        if rest:
+            # Overlong lines (minified bundles) keep only their head
+            self._tail = rest if self._tail is None else self._tail + rest
+            self._tail = self._tail[:MAX_DIFF_LINE_CHARS + 1]
+
+    def close(self):
+        if self._tail:
+            if isinstance(self._tail, bytes):
+                self._tail = self._tail.decode("utf-8", errors="replace")
+            self.feed_line(self._tail[:MAX_DIFF_LINE_CHARS])
+        self._tail = None
+        return self
+
+    def complete_from_summaries(self, summaries):
+        """Account for files a capped diff never reached.
+
+        ``summaries`` are GitHub pull-request file entries (``filename``,
+        ``status``, ``additions``, ``deletions``). Files missing from the
+        parsed part, and the file the cap cut short, take their line counts
+        from the summary; their content counters are extrapolated from the
+        parsed sample in ``total``.
+        """
+        self.truncated = True
+        parsed = {f.path: f for f in self.files}
+        if self.current is not None:
+            parsed.pop(self.current.path, None)
+            self.files.pop()
+            self.current = None
+        self._old_left = self._new_left = 0
+        self._tail = None
+        for entry in summaries:
+            path = entry.get("filename")
+            if not path or path in parsed:
+                continue
+            self.files.append(DiffFile(
+                path=path,
+                old_path=entry.get("previous_filename") or path,
+                status=FILE_STATUS.get(entry.get("status"), "modified"),
+                lines_added=int(entry.get("additions") or 0),
+                lines_deleted=int(entry.get("deletions") or 0),
+                estimated=True
+            ))
+
+    def total(self, attr):
+        if attr not in SAMPLED_COUNTERS or not self.truncated:
+            return sum(getattr(f, attr) for f in self.files)
+        exact = sum(getattr(f, attr) for f in self.files if not f.estimated)
+        sampled = sum(f.lines_added + f.lines_deleted for f in self.files if not f.estimated)
+        estimated = sum(f.lines_added + f.lines_deleted for f in self.files if f.estimated)
+        if not sampled:
+            # Nothing parsed: treat estimated lines as meaningful, no patterns
+            return estimated if attr == "meaningful_changes" else exact
+        return exact + round(exact * estimated / sampled)
+
+    def changed_paths(self):
+        # Renames touch both the old and the new path
+        paths = []
+        for f in self.files:
+            if f.old_path:
+                paths.append(f.old_path)
+            if f.path:
+                paths.append(f.path)
+        return list(dict.fromkeys(paths))
+
+    def diff_metrics(self) -> Dict[str, Any]:
+        lines_added = self.total("lines_added")
+        lines_deleted = self.total("lines_deleted")
+        import_changes = self.total("import_changes")
+        function_signature_changes = self.total("function_signature_changes")
+        class_changes = self.total("class_changes")
+        total_changes = lines_added + lines_deleted
+        change_intensity = min(total_changes / 500, 1.0)
+        critical_modification = min(
+            (import_changes * 0.1)
+            + (function_signature_changes * 0.25)
+            + (class_changes * 0.2),
+            1.0
+        )
+        largest = heapq.nlargest(
+            MAX_DIFF_FILE_BREAKDOWN, self.files,
+            key=lambda f: f.lines_added + f.lines_deleted
+        )
+        return {
+            "lines_added": lines_added,
+            "lines_deleted": lines_deleted,
+            "total_changes": total_changes,
+            "import_changes": import_changes,
+            "function_signature_changes": function_signature_changes,
+            "class_changes": class_changes,
+            "change_intensity": change_intensity,
+            "critical_modification_score": critical_modification,
+            "files_changed": len(self.files),
+            "sampled": self.truncated,
+            "file_breakdown": [f.summary() for f in largest]
+        }
+
+    def structural_delta(self) -> Dict[str, float]:
+        total_changes = self.total("lines_added") + self.total("lines_deleted")
+        if total_changes == 0:
+            return {
+                "api_surface_change": 0.0,
+                "signature_change": 0.0,
+                "import_change": 0.0,
+                "cosmetic_ratio": 1.0
+            }
+        return {
+            "api_surface_change": min(self.total("api_changes") / 5, 1.0),
+            "signature_change": min(self.total("signature_changes") / 3, 1.0),
+            "import_change": min(self.total("structural_import_changes") / 5, 1.0),
+            "cosmetic_ratio": self.total("meaningful_changes") / total_changes
+        }
+
+def parse_diff(diff) -> DiffParser:
+    """Parse a diff given as str, bytes, an iterable of chunks or a parser."""
+    if isinstance(diff, DiffParser):
+        return diff
+    parser = DiffParser()
+    if isinstance(diff, (str, bytes)):
+        # Slices keep per-chunk line splitting bounded for huge diffs
+        for start in range(0, len(diff), DIFF_CHUNK_CHARS):
+            parser.feed(diff[start:start + DIFF_CHUNK_CHARS])
+    elif diff is not None:
+        for chunk in diff:
+            parser.feed(chunk)
+    return parser.close()